@@ -1,43 +1,82 @@
 from django.contrib import admin
-from .models import Appointment, WeeklyAvailability, ExceptionDate
+from .models import Appointment, Patient, Resource, WeeklyAvailability, ExceptionDate, DemandForecast
+
+
+@admin.register(Resource)
+class ResourceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'is_active']
+    list_filter = ['kind', 'is_active']
+    search_fields = ['name']
 
 
 @admin.register(WeeklyAvailability)
 class WeeklyAvailabilityAdmin(admin.ModelAdmin):
-    list_display = ['day_of_week', 'start_time', 'end_time', 'is_active']
-    list_filter = ['day_of_week', 'is_active']
+    list_display = ['day_of_week', 'start_time', 'end_time', 'resource', 'is_active']
+    list_filter = ['day_of_week', 'is_active', 'resource']
     ordering = ['day_of_week', 'start_time']
 
 
 @admin.register(ExceptionDate)
 class ExceptionDateAdmin(admin.ModelAdmin):
-    list_display = ['date', 'exception_type', 'reason']
-    list_filter = ['exception_type']
+    list_display = ['date', 'exception_type', 'resource', 'reason']
+    list_filter = ['exception_type', 'resource']
     date_hierarchy = 'date'
     ordering = ['date']
 
 
+@admin.register(Patient)
+class PatientAdmin(admin.ModelAdmin):
+    list_display = ['email', 'name', 'phone', 'created_at']
+    search_fields = ['email', 'name']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['email']
+
+
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = [
         'reference_id', 'patient_name', 'scheduled_date',
         'scheduled_time', 'status', 'modality'
     ]
-    list_filter = ['status', 'modality', 'scheduled_date']
-    search_fields = ['reference_id', 'patient_details__name', 'patient_details__email']
-    readonly_fields = ['reference_id', 'created_at', 'updated_at']
+    list_filter = ['status', 'auto_closed', 'modality', 'scheduled_date']
+    search_fields = ['reference_id', 'patient__email', 'patient__name']
+    raw_id_fields = ['patient']
+    readonly_fields = ['reference_id', 'auto_closed', 'created_at', 'updated_at']
     date_hierarchy = 'scheduled_date'
     ordering = ['-scheduled_date', '-scheduled_time']
     
     fieldsets = (
-        ('Reference', {'fields': ('reference_id', 'status')}),
-        ('Patient', {'fields': ('patient_details', 'patient_type')}),
-        ('Scheduling', {'fields': ('service', 'scheduled_date', 'scheduled_time', 'duration_minutes', 'modality', 'timezone')}),
+        ('Reference', {'fields': ('reference_id', 'status', 'auto_closed')}),
+        ('Patient', {'fields': ('patient', 'patient_details', 'patient_type')}),
+        ('Scheduling', {'fields': ('service', 'resource', 'scheduled_date', 'scheduled_time', 'duration_minutes', 'modality', 'timezone')}),
         ('Details', {'fields': ('reason', 'notes', 'meeting_link')}),
         ('Notifications', {'fields': ('confirmation_sent', 'reminder_sent')}),
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Exact reference ID, exact email or name substring, each backed by an
+        index (unique reference_id, the email expression index, the name
+        trigram index). The default icontains lookups on search_fields are
+        not used: ORed with them the planner falls back to a sequential
+        scan. patient_details also covers appointments without a Patient.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(reference_id=term.upper()) | queryset.search_patients(term), False
+    
     def patient_name(self, obj):
         return obj.patient_name
     patient_name.short_description = 'Patient'
+
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(admin.ModelAdmin):
+    list_display = [
+        'day_of_week', 'hour', 'expected_bookings',
+        'no_show_probability', 'avg_lead_days', 'observed_outcomes', 'updated_at'
+    ]
+    list_filter = ['day_of_week']
+    ordering = ['day_of_week', 'hour']
@@ -1,61 +1,279 @@
 """
 Availability Engine - Core booking slot generation logic.
 Calculates available slots based on: WeeklyAvailability - ExceptionDates - ExistingAppointments
+
+Every practitioner/room (Resource) has its own schedule and bookings; the
+clinic-wide schedule is the resource `None`. Slots report the number of
+resources free for them as `capacity`.
+
+With the overbooking policy on (see overbooking.py), hours with a high
+predicted no-show rate accept several overlapping bookings per resource.
+
+Live slot holds (see holds.py) count as bookings, except in the per-date
+free counts, which ignore them.
+
+Internally a resource's day is a set of minute bitmasks (Python ints, bit
+m = minute m after midnight): open hours per modality, slot-grid start
+points and booked minutes. Weekly templates are built once per query;
+exceptions swap a day's template, bookings are cleared with AND NOT, and
+"whole duration fits" is a handful of shift-ANDs. TimeSlot objects are
+only created when a day's result is serialized.
+
+Slots are generated in clinic-local wall time (CLINIC_TIMEZONE) and carry
+their UTC instant (`starts_at`); localize_instants() converts a run of
+instants into a visitor's timezone per response.
 """
 
-from datetime import datetime, timedelta, date, time
-from typing import List, Dict, Optional
+from functools import lru_cache
+from datetime import datetime, timedelta, date, time, timezone as dt_timezone
+from typing import List, Dict, Optional, Tuple
 from django.db import transaction
 from django.db.models import Q
 from django.conf import settings
-from django.utils import timezone
 
+from apps.core.utils import clinic_timezone, clinic_today
 from .models import WeeklyAvailability, ExceptionDate, Appointment
+from .overbooking import overbooking_enabled, overbookable_hours, max_per_slot
+from .holds import held_ranges, claimed_ranges
+
+ALL_MODALITIES = ['virtual', 'in_person']
+
+# Shared modality tuples, indexed by (virtual offered, in-person offered)
+MODALITY_COMBOS = {
+    (True, True): ('virtual', 'in_person'),
+    (True, False): ('virtual',),
+    (False, True): ('in_person',),
+    (False, False): (),
+}
+
+
+def to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def from_minutes(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+def range_mask(start: int, end: int) -> int:
+    """Bits for minutes [start, end)."""
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+@lru_cache(maxsize=256)
+def grid_mask(start: int, end: int, step: int) -> int:
+    """Bits for slot-grid start points start, start + step, ... below end."""
+    mask = 0
+    for minute in range(start, end, step):
+        mask |= 1 << minute
+    return mask
+
+
+def fits_mask(free: int, duration: int) -> int:
+    """
+    Bits for minutes m where m .. m + duration - 1 are all free.
+    Doubling shift-ANDs: O(log duration) big-int operations.
+    """
+    fits = free
+    length = 1
+    while length < duration and fits:
+        step = min(length, duration - length)
+        fits &= fits >> step
+        length += step
+    return fits
+
+
+def iter_bits(mask: int):
+    """Set bit positions in ascending order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def day_instants(target_date: date, minutes: List[int], tz) -> List[datetime]:
+    """
+    UTC instants for clinic-local minutes of one day. When the UTC offset is
+    the same at both ends of the day (no DST change) this is plain addition
+    from the day's UTC midnight; otherwise each minute is resolved via tz.
+    """
+    midnight = datetime.combine(target_date, time(0), tzinfo=tz)
+    last = datetime.combine(target_date, time(23, 59), tzinfo=tz)
+    if midnight.utcoffset() == last.utcoffset():
+        base = midnight.astimezone(dt_timezone.utc)
+        return [base + timedelta(minutes=m) for m in minutes]
+    return [
+        datetime.combine(target_date, from_minutes(m), tzinfo=tz).astimezone(dt_timezone.utc)
+        for m in minutes
+    ]
+
+
+def localize_instants(instants: List[datetime], tz) -> List[datetime]:
+    """
+    Convert sorted UTC instants to tz in bulk: one offset lookup is reused
+    for the whole run unless the offset differs between its first and last
+    instant (a DST change inside the run).
+    """
+    if not instants:
+        return []
+    first_offset = instants[0].astimezone(tz).utcoffset()
+    if first_offset == instants[-1].astimezone(tz).utcoffset():
+        return [(instant + first_offset).replace(tzinfo=tz) for instant in instants]
+    return [instant.astimezone(tz) for instant in instants]
 
 
 class TimeSlot:
     """Represents an available time slot."""
     
-    def __init__(self, start_time: time, end_time: time, date: date, modality: List[str]):
+    __slots__ = ('start_time', 'end_time', 'date', 'modality', 'capacity', 'starts_at')
+    
+    def __init__(
+        self,
+        start_time: time,
+        end_time: time,
+        date: date,
+        modality: Tuple[str, ...],
+        capacity: int = 1,
+        starts_at: datetime = None
+    ):
         self.start_time = start_time
         self.end_time = end_time
         self.date = date
         self.modality = modality
+        self.capacity = capacity
+        # UTC instant of start_time on date in the clinic's timezone
+        self.starts_at = starts_at
     
     def to_dict(self) -> Dict:
         return {
             'date': self.date.isoformat(),
             'start_time': self.start_time.strftime('%H:%M'),
             'end_time': self.end_time.strftime('%H:%M'),
-            'modality': self.modality,
+            'starts_at': self.starts_at.isoformat() if self.starts_at else None,
+            'modality': list(self.modality),
+            'capacity': self.capacity,
         }
 
 
+class OpenMask:
+    """A resource's open minutes for one day, per modality, plus its slot grid."""
+    
+    __slots__ = ('any', 'virtual', 'in_person', 'grid')
+    
+    def __init__(self, any: int = 0, virtual: int = 0, in_person: int = 0, grid: int = 0):
+        self.any = any
+        self.virtual = virtual
+        self.in_person = in_person
+        self.grid = grid
+    
+    def add(self, start: int, end: int, modalities, step: int):
+        span = range_mask(start, end)
+        self.any |= span
+        if 'virtual' in modalities:
+            self.virtual |= span
+        if 'in_person' in modalities:
+            self.in_person |= span
+        self.grid |= grid_mask(start, end, step)
+    
+    def for_modality(self, modality: str = None) -> int:
+        return getattr(self, modality) if modality in ALL_MODALITIES else self.any
+    
+    def offered(self) -> Tuple[str, ...]:
+        return MODALITY_COMBOS[(bool(self.virtual), bool(self.in_person))]
+    
+    def within(self, start: int, end: int) -> 'OpenMask':
+        """The same mask limited to minutes [start, end)."""
+        span = range_mask(start, end)
+        return OpenMask(self.any & span, self.virtual & span, self.in_person & span, self.grid & span)
+
+
+class DayAvailability:
+    """
+    Compact result for one date: sorted free start minutes with parallel
+    capacities and modality tuples. Slots are materialized on demand.
+    """
+    
+    __slots__ = ('date', 'duration', 'starts', 'capacities', 'modalities', 'tz')
+    
+    def __init__(self, date: date, duration: int, starts: List[int], capacities: List[int], modalities: List[Tuple[str, ...]], tz):
+        self.date = date
+        self.duration = duration
+        self.starts = starts
+        self.capacities = capacities
+        self.modalities = modalities
+        self.tz = tz
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def slots(self) -> List[TimeSlot]:
+        instants = day_instants(self.date, self.starts, self.tz)
+        return [
+            TimeSlot(
+                start_time=from_minutes(start),
+                end_time=from_minutes(start + self.duration),
+                date=self.date,
+                modality=modality,
+                capacity=capacity,
+                starts_at=starts_at
+            )
+            for start, capacity, modality, starts_at in zip(
+                self.starts, self.capacities, self.modalities, instants
+            )
+        ]
+
+
+# A resource's view of one date: (resource id or None, open mask or None, booked mask)
+DaySchedule = Tuple[Optional[int], Optional[OpenMask], int]
+
+
 class AvailabilityEngine:
     """
     Core engine for calculating available booking slots.
     Uses select_for_update() for slot locking during booking.
     
-    Single-clinic mode: doctor_id is optional and kept for API compatibility.
+    doctor_id is kept for API compatibility; resources replace it.
+    
+    Candidate start times follow the slot_duration grid; each candidate must
+    fit `duration_minutes` (the length of the service being booked, default
+    one slot) inside a resource's open hours without overlapping any of that
+    resource's bookings.
     """
     
-    def __init__(self, doctor_id: int = None, slot_duration_minutes: int = None):
-        # doctor_id kept for API compatibility but not used in single-clinic mode
+    def __init__(self, doctor_id: int = None, slot_duration_minutes: int = None, duration_minutes: int = None):
+        # doctor_id kept for API compatibility; scheduling is per Resource
         self.doctor_id = doctor_id
         self.slot_duration = slot_duration_minutes or getattr(
             settings, 'BOOKING_SLOT_DURATION_MINUTES', 30
         )
+        self.duration = duration_minutes or self.slot_duration
         self.min_advance_days = getattr(settings, 'BOOKING_ADVANCE_DAYS_MIN', 1)
         self.max_advance_days = getattr(settings, 'BOOKING_ADVANCE_DAYS_MAX', 60)
+        self.tz = clinic_timezone()
+        
+        # Bookings a resource may hold at once: 1, or the policy's limit
+        # inside overbookable hours (minute mask per weekday)
+        self.overbooking_limit = 1
+        self.overbookable = {}
+        if overbooking_enabled():
+            self.overbooking_limit = max_per_slot()
+            for day_of_week, hour in overbookable_hours():
+                self.overbookable[day_of_week] = (
+                    self.overbookable.get(day_of_week, 0) | range_mask(hour * 60, hour * 60 + 60)
+                )
+        # Resources the last free_resources() call could only offer by overbooking
+        self.overbooked = set()
     
-    def get_available_slots(
+    def get_available_days(
         self,
         start_date: date = None,
         end_date: date = None,
         modality: str = None
-    ) -> List[TimeSlot]:
+    ) -> List[DayAvailability]:
         """
-        Get all available slots within date range.
+        Get compact per-date availability within date range.
         
         Args:
             start_date: Start date (default: tomorrow)
@@ -63,223 +281,438 @@ class AvailabilityEngine:
             modality: Filter by modality ('virtual', 'in_person')
         
         Returns:
-            List of available TimeSlot objects
+            One DayAvailability per date that has at least one free start
         """
-        # Set default date range
-        today = timezone.now().date()
-        if start_date is None:
-            start_date = today + timedelta(days=self.min_advance_days)
-        if end_date is None:
-            end_date = today + timedelta(days=self.max_advance_days)
+        days = []
+        for current_date, schedules in self._iter_day_schedules(start_date, end_date):
+            day = self._compute_day(current_date, schedules, modality)
+            if day:
+                days.append(day)
         
-        # Ensure dates are within valid range
+        return days
+    
+    def get_free_counts(
+        self,
+        start_date: date = None,
+        end_date: date = None
+    ) -> List[Tuple[date, Dict[str, int]]]:
+        """
+        Free start times per date, in total and per modality, for dates
+        with any. Counts are popcounts of the day's candidate masks; no
+        per-slot work is done. Slot holds are not subtracted, so placing
+        one does not invalidate the cached calendar.
+        """
+        counts = []
+        for current_date, schedules in self._iter_day_schedules(start_date, end_date, include_holds=False):
+            day_counts = self._count_day(schedules)
+            if day_counts['total']:
+                counts.append((current_date, day_counts))
+        return counts
+    
+    def booking_window(self, start_date: date = None, end_date: date = None) -> Tuple[date, date]:
+        """
+        The requested range clamped to the booking window (default: the
+        whole window). start_date is after end_date when nothing is left.
+        """
+        today = clinic_today()
         min_date = today + timedelta(days=self.min_advance_days)
         max_date = today + timedelta(days=self.max_advance_days)
-        start_date = max(start_date, min_date)
-        end_date = min(end_date, max_date)
+        return max(start_date or min_date, min_date), min(end_date or max_date, max_date)
+    
+    def _iter_day_schedules(self, start_date: date = None, end_date: date = None, include_holds: bool = True):
+        """
+        Yield (date, schedules) for each date in the range, clamped to the
+        booking window (default: the whole window).
+        """
+        start_date, end_date = self.booking_window(start_date, end_date)
+        if start_date > end_date:
+            return
         
         # Get base data
-        weekly_availability = self._get_weekly_availability()
+        weekly_masks = self._build_weekly_masks(self._get_weekly_availability())
         exception_dates = self._get_exception_dates(start_date, end_date)
-        existing_appointments = self._get_existing_appointments(start_date, end_date)
+        existing_appointments = self._get_existing_appointments(start_date, end_date, include_holds)
         
-        # Generate slots
-        available_slots = []
         current_date = start_date
-        
         while current_date <= end_date:
-            day_of_week = current_date.weekday()
-            
-            # Check if date is blocked
-            if current_date in exception_dates:
-                exception = exception_dates[current_date]
-                if exception.exception_type == ExceptionDate.ExceptionType.BLOCKED:
-                    current_date += timedelta(days=1)
-                    continue
-            
-            # Get availability for this day
-            day_availability = [
-                avail for avail in weekly_availability
-                if avail.day_of_week == day_of_week and avail.is_active
-            ]
-            
-            for avail in day_availability:
-                # Check modality filter
-                if modality:
-                    if modality == 'virtual' and not avail.allows_virtual:
-                        continue
-                    if modality == 'in_person' and not avail.allows_in_person:
-                        continue
-                
-                # Generate slots for this availability block
-                slots = self._generate_slots_for_block(
-                    current_date,
-                    avail,
-                    existing_appointments.get(current_date, [])
-                )
-                available_slots.extend(slots)
-            
+            yield current_date, self._day_schedules(
+                current_date, weekly_masks, exception_dates, existing_appointments
+            )
             current_date += timedelta(days=1)
-        
-        return available_slots
+    
+    def get_available_slots(
+        self,
+        start_date: date = None,
+        end_date: date = None,
+        modality: str = None
+    ) -> List[TimeSlot]:
+        """
+        Get all available slots within date range (see get_available_days).
+        One TimeSlot per start time, with the number of free resources as capacity.
+        """
+        return [
+            slot
+            for day in self.get_available_days(start_date, end_date, modality)
+            for slot in day.slots()
+        ]
     
     def get_slots_for_date(self, target_date: date, modality: str = None) -> List[TimeSlot]:
         """Get available slots for a specific date."""
         return self.get_available_slots(target_date, target_date, modality)
     
-    def is_slot_available(
+    def free_resources(
         self,
         target_date: date,
         target_time: time,
         modality: str = None,
-        lock: bool = False
-    ) -> bool:
+        lock: bool = False,
+        exclude_appointment_id: int = None,
+        exclude_hold: str = None
+    ) -> List[Optional[int]]:
         """
-        Check if a specific slot is available.
+        Resources free for the engine's duration starting at target_time.
         
         Args:
             target_date: Date to check
             target_time: Time to check
             modality: Modality to check
             lock: If True, use select_for_update for atomic booking
+            exclude_appointment_id: Appointment to ignore (the one being moved)
+            exclude_hold: Hold token to ignore (the visitor's own hold)
         
         Returns:
-            Boolean indicating if slot is available
+            Resource ids (None for the clinic-wide schedule); empty if the
+            slot is unavailable. Resources that would be overbooked come
+            last and are listed in self.overbooked.
         """
         # Check if date is in valid range
-        today = timezone.now().date()
+        today = clinic_today()
         min_date = today + timedelta(days=self.min_advance_days)
         max_date = today + timedelta(days=self.max_advance_days)
         
         if target_date < min_date or target_date > max_date:
-            return False
-        
-        # Check for exceptions
-        exception = ExceptionDate.objects.filter(
-            date=target_date,
-            exception_type=ExceptionDate.ExceptionType.BLOCKED
-        ).first()
+            return []
         
-        if exception:
-            return False
-        
-        # Check weekly availability
-        day_of_week = target_date.weekday()
-        availability = WeeklyAvailability.objects.filter(
-            day_of_week=day_of_week,
-            is_active=True,
-            start_time__lte=target_time,
-            end_time__gt=target_time
+        weekly_masks = self._build_weekly_masks(
+            self._active_weekly_availability().filter(day_of_week=target_date.weekday())
         )
+        exception_dates = self._group_exceptions(self._active_exception_dates().filter(date=target_date))
         
-        if modality == 'virtual':
-            availability = availability.filter(allows_virtual=True)
-        elif modality == 'in_person':
-            availability = availability.filter(allows_in_person=True)
-        
-        if not availability.exists():
-            return False
-        
-        # Check for existing appointments
+        # Lock the day's bookings across resources
         appointment_query = Appointment.objects.filter(
             scheduled_date=target_date,
-            scheduled_time=target_time,
-            status__in=[
-                Appointment.Status.PENDING,
-                Appointment.Status.APPROVED
-            ]
+            status__in=Appointment.SLOT_HOLDING_STATUSES
         )
+        if exclude_appointment_id:
+            appointment_query = appointment_query.exclude(id=exclude_appointment_id)
         
         if lock:
             appointment_query = appointment_query.select_for_update()
         
-        return not appointment_query.exists()
+        # Holds on the wanted range, read from their authoritative buckets
+        start = to_minutes(target_time)
+        resource_ids = [
+            resource_id for resource_id, _, _ in
+            self._day_schedules(target_date, weekly_masks, exception_dates, {})
+        ]
+        existing_appointments, occupied = self._booking_masks(
+            appointment_query,
+            claimed_ranges(target_date, resource_ids, start, self.duration, self.slot_duration, exclude_hold)
+        )
+        
+        wanted = range_mask(start, start + self.duration)
+        free = []
+        self.overbooked = set()
+        for resource_id, mask, booked in self._day_schedules(
+            target_date, weekly_masks, exception_dates, existing_appointments
+        ):
+            if mask is not None and mask.for_modality(modality) & ~booked & wanted == wanted:
+                free.append(resource_id)
+                if occupied.get((target_date, resource_id), 0) & wanted:
+                    self.overbooked.add(resource_id)
+        
+        # Prefer resources that are genuinely free (stable sort)
+        free.sort(key=lambda resource_id: resource_id in self.overbooked)
+        return free
+    
+    def is_slot_available(
+        self,
+        target_date: date,
+        target_time: time,
+        modality: str = None,
+        lock: bool = False,
+        exclude_appointment_id: int = None,
+        exclude_hold: str = None
+    ) -> bool:
+        """Check if any resource is free for the slot. See free_resources()."""
+        return bool(self.free_resources(
+            target_date, target_time, modality,
+            lock=lock, exclude_appointment_id=exclude_appointment_id, exclude_hold=exclude_hold
+        ))
     
     @transaction.atomic
-    def lock_slot(self, target_date: date, target_time: time, modality: str = None) -> bool:
+    def lock_slot(
+        self,
+        target_date: date,
+        target_time: time,
+        modality: str = None,
+        exclude_appointment_id: int = None,
+        exclude_hold: str = None
+    ) -> List[Optional[int]]:
         """
         Atomically check and lock a slot for booking.
         Uses select_for_update to prevent race conditions.
+        Returns the free resources (falsy when the slot is taken); the caller
+        books one of them.
         """
-        return self.is_slot_available(target_date, target_time, modality, lock=True)
+        return self.free_resources(
+            target_date, target_time, modality,
+            lock=True, exclude_appointment_id=exclude_appointment_id, exclude_hold=exclude_hold
+        )
     
-    def _get_weekly_availability(self) -> List[WeeklyAvailability]:
-        """Get weekly availability (clinic-wide in single-clinic mode)."""
-        return list(
-            WeeklyAvailability.objects.filter(
-                is_active=True
-            ).order_by('day_of_week', 'start_time')
+    @staticmethod
+    def _active_weekly_availability():
+        return WeeklyAvailability.objects.filter(
+            Q(resource__isnull=True) | Q(resource__is_active=True),
+            is_active=True
         )
     
-    def _get_exception_dates(self, start_date: date, end_date: date) -> Dict[date, ExceptionDate]:
-        """Get exception dates within range."""
-        exceptions = ExceptionDate.objects.filter(
+    @staticmethod
+    def _active_exception_dates():
+        return ExceptionDate.objects.filter(
+            Q(resource__isnull=True) | Q(resource__is_active=True)
+        )
+    
+    def _get_weekly_availability(self) -> List[WeeklyAvailability]:
+        """Get active weekly availability for the clinic and all active resources."""
+        return list(self._active_weekly_availability().order_by('day_of_week', 'start_time'))
+    
+    def _get_exception_dates(self, start_date: date, end_date: date) -> Dict[date, Dict[Optional[int], List[ExceptionDate]]]:
+        """Get exception dates within range, grouped by date and resource."""
+        return self._group_exceptions(self._active_exception_dates().filter(
             date__gte=start_date,
             date__lte=end_date
-        )
-        return {exc.date: exc for exc in exceptions}
+        ))
+    
+    @staticmethod
+    def _group_exceptions(exceptions) -> Dict[date, Dict[Optional[int], List[ExceptionDate]]]:
+        grouped = {}
+        for exc in exceptions:
+            grouped.setdefault(exc.date, {}).setdefault(exc.resource_id, []).append(exc)
+        return grouped
+    
+    @staticmethod
+    def _pick_exception(exceptions) -> Optional[ExceptionDate]:
+        """BLOCKED wins; otherwise the last MODIFIED row (resource-specific rows come last)."""
+        chosen = None
+        for exc in exceptions:
+            if exc.exception_type == ExceptionDate.ExceptionType.BLOCKED:
+                return exc
+            chosen = exc
+        return chosen
+    
+    def _build_weekly_masks(self, weekly_availability) -> Dict[Tuple[Optional[int], int], OpenMask]:
+        """Fold availability blocks into one OpenMask per (resource, weekday)."""
+        masks = {}
+        for avail in weekly_availability:
+            modalities = []
+            if avail.allows_virtual:
+                modalities.append('virtual')
+            if avail.allows_in_person:
+                modalities.append('in_person')
+            mask = masks.setdefault((avail.resource_id, avail.day_of_week), OpenMask())
+            mask.add(to_minutes(avail.start_time), to_minutes(avail.end_time), modalities, self.slot_duration)
+        return masks
+    
+    def _day_schedules(
+        self,
+        target_date: date,
+        weekly_masks: Dict[Tuple[Optional[int], int], OpenMask],
+        exception_dates: Dict[date, Dict[Optional[int], List[ExceptionDate]]],
+        existing_appointments: Dict[Tuple[date, Optional[int]], int]
+    ) -> List[DaySchedule]:
+        """
+        Open masks and booked minutes of every resource working on target_date.
+        Clinic-wide exceptions apply to every resource; resource-specific ones
+        to that resource only. A clinic-wide MODIFIED window only narrows a
+        resource's weekly hours, while the resource's own MODIFIED row sets
+        them. A day no resource works falls back to the clinic-wide
+        schedule, so a MODIFIED exception can still open it.
+        """
+        weekday = target_date.weekday()
+        day_exceptions = exception_dates.get(target_date, {})
+        clinic_exceptions = day_exceptions.get(None, [])
+        
+        resource_ids = {resource_id for resource_id, day in weekly_masks if day == weekday}
+        resource_ids.update(resource_id for resource_id in day_exceptions if resource_id is not None)
+        if not resource_ids:
+            resource_ids = {None}
+        
+        schedules = []
+        for resource_id in sorted(resource_ids, key=lambda r: (r is not None, r or 0)):
+            own_exceptions = clinic_exceptions
+            if resource_id is not None:
+                own_exceptions = day_exceptions.get(resource_id, [])
+            exception = self._pick_exception(
+                own_exceptions if resource_id is None else clinic_exceptions + own_exceptions
+            )
+            schedules.append((
+                resource_id,
+                self._apply_exception(
+                    weekly_masks.get((resource_id, weekday)),
+                    exception,
+                    narrow=exception not in own_exceptions
+                ),
+                existing_appointments.get((target_date, resource_id), 0),
+            ))
+        return schedules
+    
+    def _apply_exception(
+        self,
+        weekly: Optional[OpenMask],
+        exception: Optional[ExceptionDate],
+        narrow: bool = False
+    ) -> Optional[OpenMask]:
+        """
+        Apply a date's exception to a resource's weekly mask.
+        
+        BLOCKED closes the day. MODIFIED replaces the day's hours with the
+        exception's start/end window, offering every modality the weekday
+        normally offers (all modalities on days without weekly hours).
+        With `narrow` (a clinic-wide exception on a resource) MODIFIED only
+        keeps the weekly hours that fall inside the window.
+        """
+        if exception is None:
+            return weekly
+        if exception.exception_type == ExceptionDate.ExceptionType.BLOCKED:
+            return None
+        if exception.start_time is None or exception.end_time is None:
+            # Modified without hours set: keep the regular schedule
+            return weekly
+        
+        start, end = to_minutes(exception.start_time), to_minutes(exception.end_time)
+        if start >= end:
+            return None
+        if narrow:
+            return weekly.within(start, end) if weekly else None
+        
+        modalities = (weekly.offered() if weekly else ()) or ALL_MODALITIES
+        mask = OpenMask()
+        mask.add(start, end, modalities, self.slot_duration)
+        return mask
     
     def _get_existing_appointments(
         self,
         start_date: date,
-        end_date: date
-    ) -> Dict[date, List[Appointment]]:
-        """Get existing appointments within range, grouped by date."""
-        appointments = Appointment.objects.filter(
-            scheduled_date__gte=start_date,
-            scheduled_date__lte=end_date,
-            status__in=[
-                Appointment.Status.PENDING,
-                Appointment.Status.APPROVED
-            ]
-        ).order_by('scheduled_time')
-        
-        grouped = {}
-        for appt in appointments:
-            if appt.scheduled_date not in grouped:
-                grouped[appt.scheduled_date] = []
-            grouped[appt.scheduled_date].append(appt)
+        end_date: date,
+        include_holds: bool = True
+    ) -> Dict[Tuple[date, Optional[int]], int]:
+        """Get booked (and held) minutes within the date range, grouped by date and resource."""
+        holds = ()
+        if include_holds:
+            days = (end_date - start_date).days + 1
+            holds = held_ranges(start_date + timedelta(days=offset) for offset in range(days))
+        return self._booking_masks(
+            Appointment.objects.filter(
+                scheduled_date__gte=start_date,
+                scheduled_date__lte=end_date,
+                status__in=Appointment.SLOT_HOLDING_STATUSES
+            ),
+            holds
+        )[0]
+    
+    def _booking_masks(self, appointments, holds=()):
+        """
+        Per (date, resource): the minutes closed to new bookings, and the
+        minutes holding any booking. Without overbooking both are the union
+        of the bookings. With it, overbookable minutes only close once
+        `overbooking_limit` bookings overlap there (depth masks: depth[i]
+        holds minutes covered by more than i bookings). Holds are
+        (date, resource id, start minute, duration) tuples.
+        """
+        bookings = [
+            (scheduled_date, resource_id, to_minutes(scheduled_time), duration)
+            for scheduled_date, resource_id, scheduled_time, duration in appointments.values_list(
+                'scheduled_date', 'resource_id', 'scheduled_time', 'duration_minutes'
+            )
+        ]
+        depths = {}
+        for scheduled_date, resource_id, start, duration in bookings + list(holds):
+            span = range_mask(start, start + duration)
+            depth = depths.setdefault((scheduled_date, resource_id), [0] * self.overbooking_limit)
+            for level in range(len(depth) - 1, 0, -1):
+                depth[level] |= depth[level - 1] & span
+            depth[0] |= span
         
-        return grouped
+        closed = {}
+        occupied = {}
+        for key, depth in depths.items():
+            extra = self.overbookable.get(key[0].weekday(), 0)
+            closed[key] = (depth[0] & ~extra) | (depth[-1] & extra)
+            occupied[key] = depth[0]
+        return closed, occupied
     
-    def _generate_slots_for_block(
+    def _compute_day(
         self,
         target_date: date,
-        availability: WeeklyAvailability,
-        existing_appointments: List[Appointment]
-    ) -> List[TimeSlot]:
-        """Generate available time slots for an availability block."""
-        slots = []
+        schedules: List[DaySchedule],
+        modality: str = None
+    ) -> DayAvailability:
+        """
+        Combine every resource's masks for the day.
         
-        # Get booked times
-        booked_times = {appt.scheduled_time for appt in existing_appointments}
+        Per resource: free = open AND NOT booked, fits = starts where the
+        whole duration is free, candidates = grid AND fits. Capacity at a
+        start is the number of resources whose fits mask has that bit; the
+        modalities are those with a resource whose modality mask fits there.
+        """
+        candidates = 0
+        fitting = []
         
-        # Generate slots
-        current_time = datetime.combine(target_date, availability.start_time)
-        end_time = datetime.combine(target_date, availability.end_time)
-        slot_delta = timedelta(minutes=self.slot_duration)
+        for _, mask, booked in schedules:
+            if mask is None:
+                continue
+            fits = fits_mask(mask.for_modality(modality) & ~booked, self.duration)
+            if not fits:
+                continue
+            candidates |= mask.grid & fits
+            fitting.append((
+                fits,
+                fits_mask(mask.virtual & ~booked, self.duration),
+                fits_mask(mask.in_person & ~booked, self.duration),
+            ))
         
-        while current_time + slot_delta <= end_time:
-            slot_time = current_time.time()
-            
-            if slot_time not in booked_times:
-                # Determine available modalities
-                modalities = []
-                if availability.allows_virtual:
-                    modalities.append('virtual')
-                if availability.allows_in_person:
-                    modalities.append('in_person')
-                
-                slots.append(TimeSlot(
-                    start_time=slot_time,
-                    end_time=(current_time + slot_delta).time(),
-                    date=target_date,
-                    modality=modalities
-                ))
-            
-            current_time += slot_delta
+        starts = list(iter_bits(candidates))
+        capacities = []
+        modalities = []
+        for start in starts:
+            capacity = virtual = in_person = 0
+            for fits, fits_virtual, fits_in_person in fitting:
+                capacity += (fits >> start) & 1
+                virtual |= (fits_virtual >> start) & 1
+                in_person |= (fits_in_person >> start) & 1
+            capacities.append(capacity)
+            modalities.append(MODALITY_COMBOS[(bool(virtual), bool(in_person))])
         
-        return slots
+        return DayAvailability(target_date, self.duration, starts, capacities, modalities, self.tz)
+    
+    def _count_day(self, schedules: List[DaySchedule]) -> Dict[str, int]:
+        """Free start counts for the day: total and per modality."""
+        starts = virtual = in_person = 0
+        for _, mask, booked in schedules:
+            if mask is None:
+                continue
+            fits = fits_mask(mask.any & ~booked, self.duration)
+            if not fits:
+                continue
+            starts |= mask.grid & fits
+            virtual |= mask.grid & fits_mask(mask.virtual & ~booked, self.duration)
+            in_person |= mask.grid & fits_mask(mask.in_person & ~booked, self.duration)
+        return {
+            'total': starts.bit_count(),
+            'virtual': virtual.bit_count(),
+            'in_person': in_person.bit_count(),
+        }
 
 
 def get_available_dates(doctor_id: int, days: int = 30) -> List[date]:
@@ -288,12 +721,8 @@ def get_available_dates(doctor_id: int, days: int = 30) -> List[date]:
     Useful for calendar highlighting.
     """
     engine = AvailabilityEngine(doctor_id)
-    today = timezone.now().date()
+    today = clinic_today()
     start_date = today + timedelta(days=1)
     end_date = today + timedelta(days=days)
     
-    slots = engine.get_available_slots(start_date, end_date)
-    
-    # Get unique dates
-    available_dates = sorted(set(slot.date for slot in slots))
-    return available_dates
+    return [day for day, _ in engine.get_free_counts(start_date, end_date)]
@@ -0,0 +1,136 @@
+"""
+Caches for the public booking pages.
+
+Lookup cache (guest status page): the serialized AppointmentDetailSerializer
+payload is stored per reference ID together with an ETag, so repeat lookups
+are answered from the cache (or with 304 Not Modified) without touching the
+database. Entries are dropped after commit whenever the appointment is saved
+or changes status, and expire no later than the appointment's start time,
+when the computed is_upcoming/can_cancel flags flip.
+
+Availability cache (/slots/, /dates/): computed payloads are keyed under a
+global version number. Anything that changes which slots are free bumps
+the version once after commit, orphaning every cached payload at once;
+orphans simply expire. Slot holds are short-lived and frequent, so they
+bump a per-date hold version instead; /slots/ keys carry the hold versions
+of the dates they cover, and a hold only orphans those payloads.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.utils import clinic_today
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_KEY_PREFIX = 'appointments:lookup:'
+AVAILABILITY_VERSION_KEY = 'appointments:availability:version'
+HOLD_VERSION_KEY_PREFIX = 'appointments:availability:holds:'
+
+
+def lookup_cache_key(reference_id):
+    return f'{LOOKUP_KEY_PREFIX}{reference_id.upper()}'
+
+
+def compute_etag(data):
+    digest = hashlib.sha256(
+        json.dumps(data, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def get_cached_lookup(reference_id):
+    """Return the cached {'etag', 'data'} entry, or None."""
+    return cache.get(lookup_cache_key(reference_id))
+
+
+def cache_lookup(appointment, data):
+    """Store a serialized lookup payload and return its cache entry."""
+    entry = {'etag': compute_etag(data), 'data': data}
+
+    timeout = getattr(settings, 'APPOINTMENT_LOOKUP_CACHE_SECONDS', 3600)
+    if appointment.is_upcoming:
+        until_start = int((appointment.starts_at - timezone.now()).total_seconds())
+        timeout = max(1, min(timeout, until_start))
+
+    cache.set(lookup_cache_key(appointment.reference_id), entry, timeout)
+    return entry
+
+
+def invalidate_lookups(reference_ids):
+    """Drop cached lookups for the given reference IDs once the transaction commits."""
+    keys = [lookup_cache_key(ref) for ref in reference_ids if ref]
+    if not keys:
+        return
+
+    def _delete():
+        try:
+            cache.delete_many(keys)
+        except Exception as e:
+            logger.warning(f"Failed to invalidate {len(keys)} lookup cache entries: {e}")
+
+    transaction.on_commit(_delete)
+
+
+def hold_version_key(target_date):
+    return f'{HOLD_VERSION_KEY_PREFIX}{target_date.isoformat()}'
+
+
+def availability_cache_key(*parts, dates=()):
+    """
+    Cache key for an availability payload under the current version.
+    Resolve it once per request and reuse it for both get and set, so a
+    payload computed before a bump is never stored under the new version.
+    Pass `dates` for payloads that reflect slot holds on those dates.
+    """
+    version = cache.get_or_set(AVAILABILITY_VERSION_KEY, 1, None)
+    key = f"appointments:availability:v{version}:" + ':'.join(str(part) for part in parts)
+    if dates:
+        keys = [hold_version_key(d) for d in dates]
+        versions = cache.get_many(keys)
+        digest = hashlib.sha256(
+            ','.join(str(versions.get(k, 0)) for k in keys).encode()
+        ).hexdigest()
+        key += f':h{digest[:16]}'
+    return key
+
+
+def cache_availability(key, data):
+    timeout = getattr(settings, 'APPOINTMENT_AVAILABILITY_CACHE_SECONDS', 300)
+    cache.set(key, data, timeout)
+
+
+def bump_availability():
+    """Invalidate all cached availability payloads once the transaction commits."""
+    def _bump():
+        try:
+            cache.incr(AVAILABILITY_VERSION_KEY)
+        except ValueError:
+            cache.set(AVAILABILITY_VERSION_KEY, 2, None)
+        except Exception as e:
+            logger.warning(f"Failed to bump availability cache version: {e}")
+
+    transaction.on_commit(_bump)
+
+
+def bump_hold_date(target_date):
+    """Invalidate cached /slots/ payloads covering target_date once the transaction commits."""
+    key = hold_version_key(target_date)
+    # Outlive every payload keyed under this date; the date is not served afterwards
+    timeout = max(1, (target_date - clinic_today()).days + 2) * 60 * 60 * 24
+
+    def _bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout)
+        except Exception as e:
+            logger.warning(f"Failed to bump slot hold version for {target_date}: {e}")
+
+    transaction.on_commit(_bump)
@@ -0,0 +1,90 @@
+"""
+Demand forecasting per hour-of-week.
+
+History is loaded once into NumPy arrays and aggregated with vectorized
+scatter-adds over a (week, hour-of-week) grid:
+- expected bookings: exponentially recency-weighted weekly average
+- no-show probability: no-shows / attended outcomes per cell, shrunk
+  toward the clinic-wide rate so sparse hours are not 0% or 100%;
+  auto-closed appointments count as bookings but not as outcomes, since
+  their status was imputed from APPOINTMENT_AUTO_CLOSE_STATUS
+- lead time: mean days from booking to appointment
+"""
+
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.utils import clinic_timezone, clinic_today
+from .models import Appointment, DemandForecast
+from .overbooking import invalidate_overbookable_hours
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 7 * 24
+
+
+def build_demand_forecast(today=None):
+    """Recompute the DemandForecast table; returns the number of rows stored."""
+    today = today or clinic_today()
+    weeks = getattr(settings, 'DEMAND_FORECAST_HISTORY_WEEKS', 12)
+    half_life = getattr(settings, 'DEMAND_FORECAST_HALF_LIFE_WEEKS', 4)
+    prior_strength = getattr(settings, 'DEMAND_FORECAST_PRIOR_STRENGTH', 10)
+    tz = clinic_timezone()
+    
+    rows = list(Appointment.objects.filter(
+        scheduled_date__gte=today - timedelta(weeks=weeks),
+        scheduled_date__lt=today
+    ).exclude(
+        status=Appointment.Status.REJECTED
+    ).values_list('scheduled_date', 'scheduled_time', 'status', 'created_at', 'auto_closed'))
+    
+    forecasts = []
+    if rows:
+        scheduled = np.array([row[0].toordinal() for row in rows])
+        cell = np.array([row[0].weekday() * 24 + row[1].hour for row in rows])
+        observed_outcome = ~np.array([row[4] for row in rows], dtype=bool)
+        no_show = observed_outcome & np.array([row[2] == Appointment.Status.NO_SHOW for row in rows])
+        attended = no_show | (observed_outcome & np.array([row[2] == Appointment.Status.COMPLETED for row in rows]))
+        booked_on = np.array([timezone.localtime(row[3], tz).date().toordinal() for row in rows])
+        
+        # Week 0 is the most recent seven days
+        week = (today.toordinal() - scheduled - 1) // 7
+        counts = np.zeros((weeks, HOURS_PER_WEEK))
+        np.add.at(counts, (week, cell), 1)
+        weights = 0.5 ** (np.arange(weeks) / half_life)
+        expected = weights @ counts / weights.sum()
+        
+        observed = np.bincount(cell, minlength=HOURS_PER_WEEK)
+        outcomes = np.bincount(cell, weights=attended, minlength=HOURS_PER_WEEK)
+        no_shows = np.bincount(cell, weights=no_show, minlength=HOURS_PER_WEEK)
+        prior = no_shows.sum() / outcomes.sum() if outcomes.sum() else 0.0
+        no_show_probability = (no_shows + prior * prior_strength) / (outcomes + prior_strength)
+        
+        lead_days = np.bincount(
+            cell, weights=np.maximum(scheduled - booked_on, 0), minlength=HOURS_PER_WEEK
+        ) / np.maximum(observed, 1)
+        
+        for index in np.flatnonzero(observed):
+            day_of_week, hour = divmod(int(index), 24)
+            forecasts.append(DemandForecast(
+                day_of_week=day_of_week,
+                hour=hour,
+                expected_bookings=round(float(expected[index]), 3),
+                no_show_probability=round(float(no_show_probability[index]), 4),
+                avg_lead_days=round(float(lead_days[index]), 2),
+                observed_bookings=int(observed[index]),
+                observed_outcomes=int(outcomes[index]),
+            ))
+    
+    with transaction.atomic():
+        DemandForecast.objects.all().delete()
+        DemandForecast.objects.bulk_create(forecasts)
+        invalidate_overbookable_hours()
+    
+    logger.info(f"Demand forecast rebuilt from {len(rows)} appointments: {len(forecasts)} hour-of-week cells")
+    return len(forecasts)
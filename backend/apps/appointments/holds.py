@@ -0,0 +1,204 @@
+"""
+Short-lived slot holds while a visitor fills in the booking form.
+
+A hold claims its resource's time in slot-length buckets (every bucket its
+range touches, so any two overlapping holds share one) with cache.add(),
+which is an atomic SET NX with expiry on the Redis backend; the first
+claimant wins and a hold that loses any bucket gives back the rest. The
+buckets are authoritative: booking and placing a hold read the buckets of
+the requested range (claimed_ranges). A per-date index of holds lets
+/slots/ hide held time without reading every bucket; it is a listing hint
+only (expired entries are skipped and pruned on write), so a lost update
+can at worst show a held slot that then fails to book.
+
+Each client (throttle ident) may keep SLOT_HOLD_MAX_PER_CLIENT live holds,
+tracked in a per-client index with the same hint semantics as the date
+index, so one visitor cannot hold a whole day.
+
+Holds only invalidate cached /slots/ payloads covering their date.
+Booking with the hold's token ignores that hold, books its resource when
+still free and releases the hold after commit.
+"""
+
+import logging
+import math
+import secrets
+import time as time_module
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import bump_hold_date
+
+logger = logging.getLogger(__name__)
+
+HOLD_KEY_PREFIX = 'appointments:hold:'
+
+
+def hold_seconds():
+    return getattr(settings, 'SLOT_HOLD_SECONDS', 600)
+
+
+def _token_key(token):
+    return f'{HOLD_KEY_PREFIX}token:{token}'
+
+
+def _index_key(target_date):
+    return f'{HOLD_KEY_PREFIX}date:{target_date.isoformat()}'
+
+
+def _client_key(client):
+    return f'{HOLD_KEY_PREFIX}client:{client}'
+
+
+def max_holds_per_client():
+    return getattr(settings, 'SLOT_HOLD_MAX_PER_CLIENT', 3)
+
+
+def client_hold_count(client):
+    """Live holds placed by a client."""
+    now = time_module.time()
+    return sum(1 for expires in (cache.get(_client_key(client)) or {}).values() if expires > now)
+
+
+def _bucket_keys(target_date, resource_id, start, duration, step):
+    return [
+        f'{HOLD_KEY_PREFIX}{target_date.isoformat()}:{resource_id}:{bucket}'
+        for bucket in range(start // step, math.ceil((start + duration) / step))
+    ]
+
+
+def place_hold(target_date, resource_id, start, duration, step, client=None):
+    """
+    Claim [start, start + duration) on the resource for hold_seconds().
+    Returns the hold dict (with its token) or None if any part is held.
+    """
+    token = secrets.token_urlsafe(16)
+    ttl = hold_seconds()
+    keys = _bucket_keys(target_date, resource_id, start, duration, step)
+
+    claimed = []
+    for key in keys:
+        if not cache.add(key, (token, start, duration), ttl):
+            _release_buckets(claimed, token)
+            return None
+        claimed.append(key)
+
+    hold = {
+        'token': token,
+        'date': target_date,
+        'resource_id': resource_id,
+        'start': start,
+        'duration': duration,
+        'buckets': keys,
+        'expires': time_module.time() + ttl,
+        'client': client,
+    }
+    cache.set(_token_key(token), hold, ttl)
+
+    now = time_module.time()
+    index = {
+        other: entry for other, entry in (cache.get(_index_key(target_date)) or {}).items()
+        if entry[3] > now
+    }
+    index[token] = (resource_id, start, duration, hold['expires'])
+    cache.set(_index_key(target_date), index, ttl)
+
+    if client is not None:
+        holds = {
+            other: expires for other, expires in (cache.get(_client_key(client)) or {}).items()
+            if expires > now
+        }
+        holds[token] = hold['expires']
+        cache.set(_client_key(client), holds, ttl)
+
+    bump_hold_date(target_date)
+    return hold
+
+
+def get_hold(token):
+    """The live hold for a token, or None once it expired or was released."""
+    if not token:
+        return None
+    return cache.get(_token_key(token))
+
+
+def matching_hold(token, target_date, start):
+    """The live hold for a token if it covers this date and start minute."""
+    hold = get_hold(token)
+    if hold is None or hold['date'] != target_date or hold['start'] != start:
+        return None
+    return hold
+
+
+def release_hold(token):
+    """Give a hold's time back. Safe to call for expired or unknown tokens."""
+    hold = get_hold(token)
+    if hold is None:
+        return False
+
+    _release_buckets(hold['buckets'], token)
+    cache.delete(_token_key(token))
+    index = cache.get(_index_key(hold['date'])) or {}
+    if index.pop(token, None) is not None:
+        cache.set(_index_key(hold['date']), index, hold_seconds())
+    if hold.get('client') is not None:
+        holds = cache.get(_client_key(hold['client'])) or {}
+        if holds.pop(token, None) is not None:
+            cache.set(_client_key(hold['client']), holds, hold_seconds())
+
+    bump_hold_date(hold['date'])
+    return True
+
+
+def _release_buckets(keys, token):
+    owned = [key for key, value in cache.get_many(keys).items() if value[0] == token]
+    if owned:
+        cache.delete_many(owned)
+
+
+def claimed_ranges(target_date, resource_ids, start, duration, step, exclude_token=None):
+    """
+    [(date, resource_id, start, duration)] of holds whose buckets overlap
+    [start, start + duration) on the given resources, read from the
+    buckets themselves. Used wherever a slot is about to be taken.
+    """
+    keys = {
+        key: resource_id
+        for resource_id in resource_ids
+        for key in _bucket_keys(target_date, resource_id, start, duration, step)
+    }
+    ranges = set()
+    for key, (token, hold_start, hold_duration) in cache.get_many(list(keys)).items():
+        if token != exclude_token:
+            ranges.add((target_date, keys[key], hold_start, hold_duration))
+    return list(ranges)
+
+
+def held_ranges(dates, exclude_token=None):
+    """[(date, resource_id, start, duration)] of indexed holds on the given dates (listing hint)."""
+    dates = list(dates)
+    indexes = cache.get_many([_index_key(d) for d in dates])
+    now = time_module.time()
+    ranges = []
+    for target_date in dates:
+        for token, (resource_id, start, duration, expires) in (indexes.get(_index_key(target_date)) or {}).items():
+            if expires > now and token != exclude_token:
+                ranges.append((target_date, resource_id, start, duration))
+    return ranges
+
+
+def hold_expires_at(hold):
+    return datetime.fromtimestamp(hold['expires'], tz=dt_timezone.utc)
+
+
+def release_hold_on_commit(token):
+    def _release():
+        try:
+            release_hold(token)
+        except Exception as e:
+            logger.warning(f"Failed to release slot hold: {e}")
+
+    transaction.on_commit(_release)
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:22
+
+import django.db.models.fields.json
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+TRIGRAM_INDEX = 'appointment_name_trgm_idx'
+
+
+def create_name_trigram_index(apps, schema_editor):
+    # Trigram GIN index for name substring search; PostgreSQL only
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON appointments_appointment '
+        f"USING gin (lower(patient_details ->> 'name') gin_trgm_ops)"
+    )
+
+
+def drop_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_patient'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(django.db.models.functions.text.Lower(django.db.models.fields.json.KeyTextTransform('email', 'patient_details')), name='appointment_email_lower_idx'),
+        ),
+        migrations.RunPython(create_name_trigram_index, drop_name_trigram_index),
+    ]
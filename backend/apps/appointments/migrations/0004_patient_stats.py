@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:24
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def populate_email_hash(apps, schema_editor):
+    # Hash the stored email as-is so legacy un-normalized duplicates don't
+    # collide here; backfill_patients merges them and rehashes afterwards.
+    Patient = apps.get_model('appointments', 'Patient')
+    patients = list(Patient.objects.only('id', 'email'))
+    for patient in patients:
+        patient.email_hash = hashlib.sha256(patient.email.encode()).hexdigest()
+    Patient.objects.bulk_update(patients, ['email_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_patient_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='cancelled_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='in_person_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='last_visit_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='no_show_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='phone_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='total_appointments',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='virtual_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='email_hash',
+            field=models.CharField(default='', editable=False, help_text='SHA-256 of the normalized email, used in URLs instead of the address', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_email_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='patient',
+            name='email_hash',
+            field=models.CharField(editable=False, help_text='SHA-256 of the normalized email, used in URLs instead of the address', max_length=64, unique=True),
+        ),
+    ]
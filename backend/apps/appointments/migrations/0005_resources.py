@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_patient_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Resource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('practitioner', 'Practitioner'), ('room', 'Room')], default='practitioner', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Resource',
+                'verbose_name_plural': 'Resources',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='resource',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='appointments.resource'),
+        ),
+        migrations.AddField(
+            model_name='exceptiondate',
+            name='resource',
+            field=models.ForeignKey(blank=True, help_text='Leave empty to apply to every resource', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exception_dates', to='appointments.resource'),
+        ),
+        migrations.AddField(
+            model_name='weeklyavailability',
+            name='resource',
+            field=models.ForeignKey(blank=True, help_text='Leave empty for the clinic-wide schedule', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='weekly_availability', to='appointments.resource'),
+        ),
+    ]
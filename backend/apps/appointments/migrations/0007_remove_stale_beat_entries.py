@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+# Entries from the beat schedule config/celery.py used to define. The
+# DatabaseScheduler adds and updates entries from CELERY_BEAT_SCHEDULE but
+# never removes ones that left it; same-named entries (reminders, activity
+# log pruning) are updated in place.
+STALE_PERIODIC_TASKS = ['cleanup-expired-pending-appointments']
+
+
+def remove_stale_periodic_tasks(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(name__in=STALE_PERIODIC_TASKS).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_demand_forecast'),
+        ('django_celery_beat', '0018_improve_crontab_helptext'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_stale_periodic_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_remove_stale_beat_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demandforecast',
+            name='observed_outcomes',
+            field=models.PositiveIntegerField(default=0, help_text='Completed or no-show bookings in the history window'),
+        ),
+    ]
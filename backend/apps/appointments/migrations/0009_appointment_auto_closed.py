@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:19
+
+from django.db import migrations, models
+
+
+AUTO_CLOSE_REASON = 'auto-closed after appointment time'
+
+# Activity log action type -> status close_past_appointments set
+AUTO_CLOSE_OUTCOMES = {
+    'appointment_completed': 'completed',
+    'appointment_no_show': 'no_show',
+}
+
+
+def flag_auto_closed(apps, schema_editor):
+    # Appointments the activity log shows were auto-closed and still carry
+    # the imputed status (an admin correction since then wins)
+    ActivityLog = apps.get_model('core', 'ActivityLog')
+    Appointment = apps.get_model('appointments', 'Appointment')
+    for action_type, status in AUTO_CLOSE_OUTCOMES.items():
+        ids = ActivityLog.objects.filter(
+            action_type=action_type,
+            related_object_type='Appointment',
+            metadata__reason=AUTO_CLOSE_REASON,
+        ).values('related_object_id')
+        Appointment.objects.filter(id__in=ids, status=status).update(auto_closed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_demandforecast_observed_outcomes'),
+        ('core', '0004_alter_activitylog_action_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='auto_closed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='demandforecast',
+            name='observed_outcomes',
+            field=models.PositiveIntegerField(default=0, help_text='Staff-recorded completed or no-show bookings in the history window'),
+        ),
+        migrations.RunPython(flag_auto_closed, migrations.RunPython.noop),
+    ]
@@ -4,11 +4,40 @@ Hardened models with proper constraints and atomic operations.
 """
 
 from django.db import models
+from django.db.models import Q, F, Value, Exists, OuterRef, Subquery, Max
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Lower, Greatest, Coalesce
+from django.db.models.lookups import Exact, Contains
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
-from apps.core.models import TimeStampedModel
-from apps.core.utils import generate_reference_id
+from apps.core.models import TimeStampedModel, ReferenceIdModel
+from apps.core.utils import hash_email, clinic_timezone
+
+
+class Resource(TimeStampedModel):
+    """
+    A bookable practitioner or room.
+    Each resource runs one appointment at a time, so bookable capacity grows
+    with the number of active resources. Availability, exceptions and
+    appointments without a resource belong to the clinic-wide schedule.
+    """
+    
+    class Kind(models.TextChoices):
+        PRACTITIONER = 'practitioner', 'Practitioner'
+        ROOM = 'room', 'Room'
+    
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.PRACTITIONER)
+    is_active = models.BooleanField(default=True)
+    
+    class Meta:
+        verbose_name = 'Resource'
+        verbose_name_plural = 'Resources'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_kind_display()})"
 
 
 class WeeklyAvailability(TimeStampedModel):
@@ -26,8 +55,15 @@ class WeeklyAvailability(TimeStampedModel):
         SATURDAY = 5, 'Saturday'
         SUNDAY = 6, 'Sunday'
     
-    # No longer using doctor field - admin manages all appointments
-    # Kept for backward compatibility, will be removed in future migration
+    # Per-resource schedule; rows without a resource are the clinic-wide hours
+    resource = models.ForeignKey(
+        Resource,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='weekly_availability',
+        help_text="Leave empty for the clinic-wide schedule"
+    )
     day_of_week = models.IntegerField(choices=DayOfWeek.choices)
     start_time = models.TimeField()
     end_time = models.TimeField()
@@ -55,8 +91,15 @@ class ExceptionDate(TimeStampedModel):
         BLOCKED = 'blocked', 'Blocked (No Appointments)'
         MODIFIED = 'modified', 'Modified Hours'
     
-    # No longer using doctor field - admin manages all exceptions
-    # Kept for backward compatibility, will be removed in future migration
+    # Exception for one resource; rows without a resource close or modify the whole clinic
+    resource = models.ForeignKey(
+        Resource,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='exception_dates',
+        help_text="Leave empty to apply to every resource"
+    )
     date = models.DateField()
     exception_type = models.CharField(
         max_length=20,
@@ -78,7 +121,259 @@ class ExceptionDate(TimeStampedModel):
         return f"{self.date} ({self.get_exception_type_display()})"
 
 
-class Appointment(TimeStampedModel):
+class Patient(TimeStampedModel):
+    """
+    Guest patient, deduplicated by normalized email.
+    Appointments keep their patient_details snapshot; this table makes
+    patient-level questions indexed joins instead of JSON scans.
+    """
+    email = models.EmailField(unique=True, help_text="Normalized (trimmed, lowercase)")
+    email_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        editable=False,
+        help_text="SHA-256 of the normalized email, used in URLs instead of the address"
+    )
+    name = models.CharField(max_length=100, blank=True)
+    phone = models.CharField(max_length=20, blank=True)
+    
+    # Aggregate cache, maintained incrementally on booking and status changes
+    total_appointments = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    no_show_count = models.PositiveIntegerField(default=0)
+    virtual_count = models.PositiveIntegerField(default=0)
+    in_person_count = models.PositiveIntegerField(default=0)
+    phone_count = models.PositiveIntegerField(default=0)
+    last_visit_date = models.DateField(null=True, blank=True)
+    
+    # Appointment status value -> outcome counter
+    OUTCOME_FIELDS = {
+        'completed': 'completed_count',
+        'cancelled': 'cancelled_count',
+        'no_show': 'no_show_count',
+    }
+    # Appointment modality value -> modality counter
+    MODALITY_FIELDS = {
+        'virtual': 'virtual_count',
+        'in_person': 'in_person_count',
+        'phone': 'phone_count',
+    }
+    
+    class Meta:
+        verbose_name = 'Patient'
+        verbose_name_plural = 'Patients'
+        ordering = ['email']
+    
+    def __str__(self):
+        return f"{self.name} <{self.email}>" if self.name else self.email
+    
+    def save(self, *args, **kwargs):
+        self.email = self.normalize_email(self.email)
+        self.email_hash = hash_email(self.email)
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def normalize_email(email):
+        return (email or '').strip().lower()
+    
+    @property
+    def no_show_rate(self):
+        """Share of attended-or-missed visits that were no-shows (0-100)."""
+        resolved = self.completed_count + self.no_show_count
+        return round(self.no_show_count / resolved * 100, 1) if resolved else None
+    
+    @property
+    def cancel_rate(self):
+        return round(self.cancelled_count / self.total_appointments * 100, 1) if self.total_appointments else None
+    
+    @property
+    def reliability_score(self):
+        """Completed share of resolved bookings (0-100), None without history."""
+        resolved = self.completed_count + self.no_show_count + self.cancelled_count
+        return round(self.completed_count / resolved * 100) if resolved else None
+    
+    @property
+    def preferred_modality(self):
+        counts = {modality: getattr(self, field) for modality, field in self.MODALITY_FIELDS.items()}
+        modality, count = max(counts.items(), key=lambda item: item[1])
+        return modality if count else None
+    
+    def get_stats(self):
+        return {
+            'total_appointments': self.total_appointments,
+            'completed': self.completed_count,
+            'cancelled': self.cancelled_count,
+            'no_show': self.no_show_count,
+            'last_visit_date': self.last_visit_date.isoformat() if self.last_visit_date else None,
+            'no_show_rate': self.no_show_rate,
+            'cancel_rate': self.cancel_rate,
+            'reliability_score': self.reliability_score,
+            'preferred_modality': self.preferred_modality,
+        }
+    
+    @classmethod
+    def record_booking(cls, patient_id, modality):
+        """Count a new booking against the patient's aggregates."""
+        updates = {'total_appointments': F('total_appointments') + 1}
+        modality_field = cls.MODALITY_FIELDS.get(modality)
+        if modality_field:
+            updates[modality_field] = F(modality_field) + 1
+        cls.objects.filter(pk=patient_id).update(**updates)
+    
+    @classmethod
+    def record_modality_change(cls, patient_id, previous_modality, modality):
+        """Move a rescheduled booking between the modality counters."""
+        previous_field = cls.MODALITY_FIELDS.get(previous_modality)
+        new_field = cls.MODALITY_FIELDS.get(modality)
+        if previous_field == new_field:
+            return
+        updates = {}
+        if previous_field:
+            updates[previous_field] = F(previous_field) - 1
+        if new_field:
+            updates[new_field] = F(new_field) + 1
+        cls.objects.filter(pk=patient_id).update(**updates)
+    
+    @staticmethod
+    def last_visit_subquery():
+        """Latest completed visit per patient, for recomputing last_visit_date."""
+        return Subquery(
+            Appointment.objects.filter(
+                patient_id=OuterRef('pk'), status='completed'
+            ).order_by().values('patient_id').annotate(
+                last_visit=Max('scheduled_date')
+            ).values('last_visit')[:1]
+        )
+    
+    @classmethod
+    def apply_status_changes(cls, changes):
+        """
+        Apply status transitions to the outcome counters.
+        One UPDATE per affected patient; transitions between non-outcome
+        statuses (e.g. pending -> approved) cost nothing. Reverting a
+        completion recomputes last_visit_date from the remaining visits.
+        """
+        deltas = {}
+        last_visits = {}
+        reverted_visits = set()
+        for change in changes:
+            patient_id = change.get('patient_id')
+            if not patient_id:
+                continue
+            patient_deltas = deltas.setdefault(patient_id, {})
+            previous_field = cls.OUTCOME_FIELDS.get(change['previous_status'])
+            new_field = cls.OUTCOME_FIELDS.get(change['status'])
+            if previous_field:
+                patient_deltas[previous_field] = patient_deltas.get(previous_field, 0) - 1
+            if new_field:
+                patient_deltas[new_field] = patient_deltas.get(new_field, 0) + 1
+            if change['status'] == 'completed':
+                visit = change['scheduled_date']
+                last_visits[patient_id] = max(visit, last_visits.get(patient_id, visit))
+            elif change['previous_status'] == 'completed':
+                reverted_visits.add(patient_id)
+        
+        for patient_id, patient_deltas in deltas.items():
+            updates = {
+                field: F(field) + delta
+                for field, delta in patient_deltas.items() if delta
+            }
+            if patient_id in reverted_visits:
+                updates['last_visit_date'] = cls.last_visit_subquery()
+            elif patient_id in last_visits:
+                visit = Value(last_visits[patient_id])
+                updates['last_visit_date'] = Greatest(Coalesce(F('last_visit_date'), visit), visit)
+            if updates:
+                cls.objects.filter(pk=patient_id).update(**updates)
+    
+    @classmethod
+    def recompute_stats(cls, patient_ids=None):
+        """
+        Rebuild the aggregate cache from appointments in one grouped query.
+        Patients left without appointments are reset to zero.
+        """
+        from django.db.models import Count
+        
+        appointments = Appointment.objects.exclude(patient__isnull=True)
+        patients_without = cls.objects.filter(~Exists(Appointment.objects.filter(patient_id=OuterRef('pk'))))
+        if patient_ids is not None:
+            appointments = appointments.filter(patient_id__in=patient_ids)
+            patients_without = patients_without.filter(pk__in=patient_ids)
+        
+        aggregates = {
+            'total_appointments': Count('id'),
+            'last_visit_date': Max('scheduled_date', filter=Q(status='completed')),
+        }
+        for value, field in {**cls.OUTCOME_FIELDS, **cls.MODALITY_FIELDS}.items():
+            lookup = 'status' if value in cls.OUTCOME_FIELDS else 'modality'
+            aggregates[field] = Count('id', filter=Q(**{lookup: value}))
+        
+        rows = appointments.order_by().values('patient_id').annotate(**aggregates)
+        patients = []
+        for row in rows:
+            patient = cls(pk=row.pop('patient_id'))
+            for field, value in row.items():
+                setattr(patient, field, value)
+            patients.append(patient)
+        
+        cls.objects.bulk_update(patients, list(aggregates), batch_size=500)
+        reset = patients_without.update(
+            last_visit_date=None,
+            **{field: 0 for field in aggregates if field != 'last_visit_date'}
+        )
+        return len(patients) + reset
+    
+    @classmethod
+    def from_details(cls, patient_details):
+        """
+        Get or create the patient for a patient_details payload.
+        Latest name/phone win. Returns None when there is no email.
+        """
+        email = cls.normalize_email((patient_details or {}).get('email'))
+        if not email:
+            return None
+        
+        name = (patient_details.get('name') or '')[:100]
+        phone = (patient_details.get('phone') or '')[:20]
+        
+        patient, created = cls.objects.get_or_create(
+            email=email,
+            defaults={'name': name, 'phone': phone}
+        )
+        if not created and (name, phone) != (patient.name, patient.phone):
+            patient.name = name or patient.name
+            patient.phone = phone or patient.phone
+            patient.save(update_fields=['name', 'phone', 'updated_at'])
+        return patient
+
+
+class AppointmentQuerySet(models.QuerySet):
+    """
+    Patient lookups over patient_details that match the expression indexes
+    on lower(patient_details->>'email') and lower(patient_details->>'name').
+    """
+    
+    @staticmethod
+    def email_expression():
+        return Lower(KeyTextTransform('email', 'patient_details'))
+    
+    @staticmethod
+    def name_expression():
+        return Lower(KeyTextTransform('name', 'patient_details'))
+    
+    def search_patients(self, term):
+        """Exact email match or name substring (trigram-indexed on PostgreSQL)."""
+        term = (term or '').strip().lower()
+        if not term:
+            return self.none()
+        return self.filter(
+            Q(Exact(self.email_expression(), term)) |
+            Q(Contains(self.name_expression(), term))
+        )
+
+
+class Appointment(ReferenceIdModel, TimeStampedModel):
     """
     Main appointment model.
     Stores all booking information with guest checkout support.
@@ -97,6 +392,12 @@ class Appointment(TimeStampedModel):
         IN_PERSON = 'in_person', 'In-Person'
         PHONE = 'phone', 'Phone Call'
     
+    # Statuses that occupy their slot in the availability engine
+    SLOT_HOLDING_STATUSES = (Status.PENDING, Status.APPROVED)
+    
+    # Fields whose change moves the appointment in the availability grid
+    SCHEDULING_FIELDS = frozenset({'scheduled_date', 'scheduled_time', 'duration_minutes', 'modality', 'resource'})
+    
     class PatientType(models.TextChoices):
         NEW = 'new', 'New Patient'
         RETURNING = 'returning', 'Returning Patient'
@@ -118,13 +419,21 @@ class Appointment(TimeStampedModel):
         db_index=True
     )
     
-    # Scheduling - No doctor field needed, admin manages all appointments
+    # Scheduling - resource is the practitioner/room holding the slot;
+    # empty for bookings on the clinic-wide schedule
     service = models.ForeignKey(
         'services.Service',
         on_delete=models.SET_NULL,
         null=True,
         related_name='appointments'
     )
+    resource = models.ForeignKey(
+        Resource,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='appointments'
+    )
     scheduled_date = models.DateField(db_index=True)
     scheduled_time = models.TimeField()
     duration_minutes = models.PositiveIntegerField(default=30)
@@ -143,6 +452,13 @@ class Appointment(TimeStampedModel):
     )
     
     # Guest Patient Details (No Login Required)
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='appointments'
+    )
     patient_details = models.JSONField(
         default=dict,
         help_text="Patient info: name, email, phone"
@@ -156,9 +472,14 @@ class Appointment(TimeStampedModel):
     confirmation_sent = models.BooleanField(default=False)
     reminder_sent = models.BooleanField(default=False)
     
+    # Outcome imputed by close_past_appointments rather than recorded by staff
+    auto_closed = models.BooleanField(default=False)
+    
     # Meeting Details (for virtual)
     meeting_link = models.URLField(blank=True)
     
+    objects = AppointmentQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Appointment'
         verbose_name_plural = 'Appointments'
@@ -167,24 +488,33 @@ class Appointment(TimeStampedModel):
             models.Index(fields=['scheduled_date', 'scheduled_time']),
             models.Index(fields=['status', 'scheduled_date']),
             models.Index(fields=['reference_id']),
+            models.Index(
+                AppointmentQuerySet.email_expression(),
+                name='appointment_email_lower_idx'
+            ),
         ]
     
     def __str__(self):
         return f"{self.reference_id} - {self.patient_name} on {self.scheduled_date}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status/modality so post_save can detect changes
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_modality = instance.__dict__.get('modality')
+        return instance
+    
     def save(self, *args, **kwargs):
-        if not self.reference_id:
-            self.reference_id = self._generate_unique_reference_id()
+        if self.patient_id is None and not kwargs.get('update_fields'):
+            self.patient = Patient.from_details(self.patient_details)
+        if self.auto_closed and self.status != getattr(self, '_loaded_status', self.status):
+            # A status set by staff replaces the imputed outcome
+            self.auto_closed = False
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = [*kwargs['update_fields'], 'auto_closed']
         super().save(*args, **kwargs)
     
-    def _generate_unique_reference_id(self):
-        """Generate a unique reference ID."""
-        for _ in range(10):  # Max 10 attempts
-            ref_id = generate_reference_id()
-            if not Appointment.objects.filter(reference_id=ref_id).exists():
-                return ref_id
-        raise ValueError("Could not generate unique reference ID")
-    
     @property
     def patient_name(self):
         return self.patient_details.get('name', 'Unknown')
@@ -203,15 +533,16 @@ class Appointment(TimeStampedModel):
         from datetime import datetime
         return datetime.combine(self.scheduled_date, self.scheduled_time)
     
+    @property
+    def starts_at(self):
+        """Aware start instant; scheduled date/time are clinic-local wall time."""
+        from datetime import datetime
+        return datetime.combine(self.scheduled_date, self.scheduled_time, tzinfo=clinic_timezone())
+    
     @property
     def is_upcoming(self):
         """Check if appointment is in the future."""
-        from datetime import datetime
-        now = timezone.now()
-        scheduled = timezone.make_aware(
-            datetime.combine(self.scheduled_date, self.scheduled_time)
-        )
-        return scheduled > now
+        return self.starts_at > timezone.now()
     
     @property
     def can_cancel(self):
@@ -220,6 +551,11 @@ class Appointment(TimeStampedModel):
             return False
         return self.is_upcoming
     
+    @property
+    def can_reschedule(self):
+        """Only upcoming appointments that still hold their slot can be moved."""
+        return self.status in self.SLOT_HOLDING_STATUSES and self.is_upcoming
+    
     def approve(self, meeting_link=''):
         """Approve the appointment."""
         self.status = self.Status.APPROVED
@@ -241,7 +577,57 @@ class Appointment(TimeStampedModel):
             self.notes = f"Cancelled: {reason}\n{self.notes}"
         self.save(update_fields=['status', 'notes', 'updated_at'])
     
+    def reschedule(self, scheduled_date, scheduled_time, modality=None, timezone_name=None, resource_id=None):
+        """
+        Move the appointment to a new slot. Approved appointments go back to
+        pending so the clinic confirms the new time. Callers must hold the
+        target slot via AvailabilityEngine.lock_slot() and pass one of the
+        resources it returned.
+        """
+        self.scheduled_date = scheduled_date
+        self.scheduled_time = scheduled_time
+        self.resource_id = resource_id
+        if modality:
+            self.modality = modality
+        if timezone_name:
+            self.timezone = timezone_name
+        self.status = self.Status.PENDING
+        self.reminder_sent = False
+        self.save(update_fields=[
+            'scheduled_date', 'scheduled_time', 'resource', 'modality', 'timezone',
+            'status', 'reminder_sent', 'updated_at'
+        ])
+    
     def complete(self):
-        """Mark appointment as completed."""
+        """Mark appointment as completed (confirms an auto-closed outcome)."""
         self.status = self.Status.COMPLETED
-        self.save(update_fields=['status', 'updated_at'])
+        self.auto_closed = False
+        self.save(update_fields=['status', 'auto_closed', 'updated_at'])
+
+
+class DemandForecast(TimeStampedModel):
+    """
+    Nightly demand forecast per hour-of-week (clinic-local), rebuilt from
+    appointment history by the generate_demand_forecast task.
+    """
+    
+    day_of_week = models.IntegerField(choices=WeeklyAvailability.DayOfWeek.choices)
+    hour = models.PositiveSmallIntegerField(validators=[MaxValueValidator(23)])
+    expected_bookings = models.FloatField(help_text="Recency-weighted bookings per week")
+    no_show_probability = models.FloatField(
+        validators=[MinValueValidator(0), MaxValueValidator(1)]
+    )
+    avg_lead_days = models.FloatField(help_text="Mean days between booking and appointment")
+    observed_bookings = models.PositiveIntegerField(help_text="Bookings in the history window")
+    observed_outcomes = models.PositiveIntegerField(
+        default=0, help_text="Staff-recorded completed or no-show bookings in the history window"
+    )
+    
+    class Meta:
+        verbose_name = 'Demand Forecast'
+        verbose_name_plural = 'Demand Forecasts'
+        ordering = ['day_of_week', 'hour']
+        unique_together = ['day_of_week', 'hour']
+    
+    def __str__(self):
+        return f"{self.get_day_of_week_display()} {self.hour:02d}:00 ~{self.expected_bookings:.1f}/week"
@@ -0,0 +1,93 @@
+"""
+Overbooking policy driven by predicted no-show rates.
+
+When OVERBOOKING_ENABLED is set, hours-of-week whose forecast no-show
+probability (DemandForecast, rebuilt nightly) reaches
+OVERBOOKING_NO_SHOW_THRESHOLD accept up to OVERBOOKING_MAX_PER_SLOT
+overlapping bookings per resource; every other hour stays at one. The
+availability engine applies the policy, so it is enforced under the same
+row locks as any booking. Overbooked bookings are counted per day in the
+cache for the dashboard.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core.utils import clinic_today
+from .cache import bump_availability
+
+logger = logging.getLogger(__name__)
+
+NO_SHOW_RATES_KEY = 'appointments:overbooking:rates'
+COUNTER_KEY_PREFIX = 'appointments:overbooking:count:'
+COUNTER_TIMEOUT = 60 * 60 * 24 * 90
+
+
+def overbooking_enabled():
+    return getattr(settings, 'OVERBOOKING_ENABLED', False)
+
+
+def max_per_slot():
+    return max(1, getattr(settings, 'OVERBOOKING_MAX_PER_SLOT', 2))
+
+
+def overbookable_hours():
+    """
+    {(day_of_week, hour): no-show probability} for hours at or above the
+    threshold with enough completed/no-show outcomes behind the rate.
+    Cached until the forecast is rebuilt.
+    """
+    from .models import DemandForecast
+
+    rates = cache.get(NO_SHOW_RATES_KEY)
+    if rates is None:
+        rates = {
+            (day_of_week, hour): probability
+            for day_of_week, hour, probability in DemandForecast.objects.filter(
+                no_show_probability__gte=getattr(settings, 'OVERBOOKING_NO_SHOW_THRESHOLD', 0.25),
+                observed_outcomes__gte=getattr(settings, 'OVERBOOKING_MIN_OBSERVATIONS', 20),
+            ).values_list('day_of_week', 'hour', 'no_show_probability')
+        }
+        cache.set(NO_SHOW_RATES_KEY, rates, 60 * 60 * 24)
+    return rates
+
+
+def invalidate_overbookable_hours():
+    """Drop cached rates after a forecast rebuild; slots change if the policy is on."""
+    cache.delete(NO_SHOW_RATES_KEY)
+    if overbooking_enabled():
+        bump_availability()
+
+
+def record_overbooking(appointment):
+    """Count an overbooked booking once the transaction commits."""
+    key = f'{COUNTER_KEY_PREFIX}{clinic_today().isoformat()}'
+
+    def _incr():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, COUNTER_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Failed to record overbooking metric: {e}")
+
+    logger.info(
+        f"Overbooked appointment {appointment.reference_id} on "
+        f"{appointment.scheduled_date} {appointment.scheduled_time} (resource {appointment.resource_id})"
+    )
+    transaction.on_commit(_incr)
+
+
+def overbooking_counts(days=14):
+    """Overbooked bookings per day for the last `days` days, oldest first."""
+    today = clinic_today()
+    dates = [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    counts = cache.get_many([f'{COUNTER_KEY_PREFIX}{d.isoformat()}' for d in dates])
+    return [
+        {'date': d.isoformat(), 'overbooked': counts.get(f'{COUNTER_KEY_PREFIX}{d.isoformat()}', 0)}
+        for d in dates
+    ]
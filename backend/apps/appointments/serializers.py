@@ -3,13 +3,22 @@ Appointment serializers.
 """
 
 from rest_framework import serializers
-from django.utils import timezone
 from datetime import datetime, timedelta
 
 from apps.core.serializers import HoneypotMixin
+from apps.core.utils import get_timezone, clinic_today
+from apps.services.models import Service
 from apps.services.serializers import ServiceListSerializer
-from .models import Appointment, WeeklyAvailability, ExceptionDate
-from .availability import AvailabilityEngine
+from .models import Appointment, Resource, WeeklyAvailability, ExceptionDate
+from .availability import AvailabilityEngine, to_minutes
+from .holds import matching_hold
+
+
+def get_service_duration(service_id):
+    """Duration in minutes of the service being booked; None for the default slot length."""
+    if not service_id:
+        return None
+    return Service.objects.filter(id=service_id).values_list('duration_minutes', flat=True).first()
 
 
 class PatientDetailsSerializer(serializers.Serializer):
@@ -37,21 +46,18 @@ class BookingRequestSerializer(HoneypotMixin, serializers.Serializer):
     modality = serializers.ChoiceField(choices=Appointment.Modality.choices)
     timezone = serializers.CharField(max_length=50, default='UTC')
     reason = serializers.CharField(max_length=1000, required=False, allow_blank=True)
+    hold_token = serializers.CharField(max_length=64, required=False, allow_blank=True)
     
     def validate_timezone(self, value):
         """Validate timezone is valid."""
-        import pytz
-        if value not in pytz.all_timezones:
-            # Allow common timezone formats
-            common_timezones = ['UTC', 'GMT', 'EST', 'PST', 'CST', 'MST']
-            if value not in common_timezones:
-                # Try to be lenient - just return UTC if invalid
-                return 'UTC'
+        if get_timezone(value) is None:
+            # Try to be lenient - just return UTC if invalid
+            return 'UTC'
         return value
     
     def validate_scheduled_date(self, value):
         """Validate that date is within allowed range."""
-        today = timezone.now().date()
+        today = clinic_today()
         min_date = today + timedelta(days=1)
         max_date = today + timedelta(days=60)
         
@@ -69,9 +75,15 @@ class BookingRequestSerializer(HoneypotMixin, serializers.Serializer):
         modality = data.get('modality')
         
         # Single-clinic mode - no doctor_id required
-        engine = AvailabilityEngine()
+        engine = AvailabilityEngine(duration_minutes=get_service_duration(data.get('service_id')))
+        
+        # The visitor's own hold on this slot does not block them
+        hold = matching_hold(data.get('hold_token'), scheduled_date, to_minutes(scheduled_time))
         
-        if not engine.is_slot_available(scheduled_date, scheduled_time, modality):
+        if not engine.is_slot_available(
+            scheduled_date, scheduled_time, modality,
+            exclude_hold=hold['token'] if hold else None
+        ):
             raise serializers.ValidationError({
                 'scheduled_time': 'This time slot is no longer available. Please select another time.'
             })
@@ -79,6 +91,39 @@ class BookingRequestSerializer(HoneypotMixin, serializers.Serializer):
         return data
 
 
+class RescheduleRequestSerializer(serializers.Serializer):
+    """
+    Serializer for guest reschedule requests.
+    Slot availability is checked under lock by the view, not here.
+    """
+    scheduled_date = serializers.DateField()
+    scheduled_time = serializers.TimeField()
+    modality = serializers.ChoiceField(choices=Appointment.Modality.choices, required=False)
+    timezone = serializers.CharField(max_length=50, required=False)
+    
+    validate_timezone = BookingRequestSerializer.validate_timezone
+    validate_scheduled_date = BookingRequestSerializer.validate_scheduled_date
+
+
+class SlotHoldSerializer(serializers.Serializer):
+    """Serializer for soft-hold requests made while the booking form is open."""
+    service_id = serializers.IntegerField(required=False, allow_null=True)
+    scheduled_date = serializers.DateField()
+    scheduled_time = serializers.TimeField()
+    modality = serializers.ChoiceField(choices=Appointment.Modality.choices)
+    
+    validate_scheduled_date = BookingRequestSerializer.validate_scheduled_date
+    
+    def validate(self, data):
+        """Resolve the service duration the hold must cover."""
+        data['duration_minutes'] = None
+        if data.get('service_id'):
+            data['duration_minutes'] = get_service_duration(data['service_id'])
+            if data['duration_minutes'] is None:
+                raise serializers.ValidationError({'service_id': 'Service not found.'})
+        return data
+
+
 class AppointmentListSerializer(serializers.ModelSerializer):
     """Serializer for appointment list view."""
     patient_name = serializers.CharField(read_only=True)
@@ -108,6 +153,7 @@ class AppointmentDetailSerializer(serializers.ModelSerializer):
     modality_display = serializers.CharField(source='get_modality_display', read_only=True)
     is_upcoming = serializers.BooleanField(read_only=True)
     can_cancel = serializers.BooleanField(read_only=True)
+    starts_at = serializers.DateTimeField(read_only=True)
     
     class Meta:
         model = Appointment
@@ -115,7 +161,7 @@ class AppointmentDetailSerializer(serializers.ModelSerializer):
             'id', 'reference_id', 'status', 'status_display',
             'patient_details', 'patient_name', 'patient_email', 'patient_phone',
             'patient_type', 'service',
-            'scheduled_date', 'scheduled_time', 'duration_minutes',
+            'scheduled_date', 'scheduled_time', 'starts_at', 'duration_minutes',
             'modality', 'modality_display', 'timezone', 'reason',
             'meeting_link', 'is_upcoming', 'can_cancel',
             'confirmation_sent', 'reminder_sent',
@@ -133,7 +179,7 @@ class AppointmentAdminSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = '__all__'
-        read_only_fields = ['reference_id', 'created_at', 'updated_at']
+        read_only_fields = ['reference_id', 'auto_closed', 'created_at', 'updated_at']
 
 
 class AppointmentActionSerializer(serializers.Serializer):
@@ -143,6 +189,18 @@ class AppointmentActionSerializer(serializers.Serializer):
     meeting_link = serializers.URLField(required=False, allow_blank=True)
 
 
+class BulkAppointmentActionSerializer(serializers.Serializer):
+    """Serializer for bulk admin actions on many appointments."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500
+    )
+    action = serializers.ChoiceField(choices=['approve', 'reject', 'cancel', 'complete'])
+    reason = serializers.CharField(max_length=500, required=False, allow_blank=True)
+    meeting_link = serializers.URLField(required=False, allow_blank=True)
+
+
 class AvailableSlotsSerializer(serializers.Serializer):
     """Serializer for available slots request."""
     doctor_id = serializers.IntegerField(required=False)  # Optional in single-clinic mode
@@ -152,6 +210,24 @@ class AvailableSlotsSerializer(serializers.Serializer):
         choices=['virtual', 'in_person'],
         required=False
     )
+    service_id = serializers.IntegerField(required=False, allow_null=True)
+    timezone = serializers.CharField(max_length=50, required=False)
+    
+    def validate_timezone(self, value):
+        """Resolve the visitor's timezone to a (cached) tzinfo."""
+        tz = get_timezone(value)
+        if tz is None:
+            raise serializers.ValidationError('Unknown timezone.')
+        return tz
+    
+    def validate(self, data):
+        """Resolve the service duration the slots must fit."""
+        data['duration_minutes'] = None
+        if data.get('service_id'):
+            data['duration_minutes'] = get_service_duration(data['service_id'])
+            if data['duration_minutes'] is None:
+                raise serializers.ValidationError({'service_id': 'Service not found.'})
+        return data
 
 
 class TimeSlotSerializer(serializers.Serializer):
@@ -160,6 +236,16 @@ class TimeSlotSerializer(serializers.Serializer):
     start_time = serializers.TimeField()
     end_time = serializers.TimeField()
     modality = serializers.ListField(child=serializers.CharField())
+    capacity = serializers.IntegerField()
+
+
+class ResourceSerializer(serializers.ModelSerializer):
+    """Serializer for practitioners and rooms."""
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    
+    class Meta:
+        model = Resource
+        fields = ['id', 'name', 'kind', 'kind_display', 'is_active']
 
 
 class WeeklyAvailabilitySerializer(serializers.ModelSerializer):
@@ -169,7 +255,7 @@ class WeeklyAvailabilitySerializer(serializers.ModelSerializer):
     class Meta:
         model = WeeklyAvailability
         fields = [
-            'id', 'day_of_week', 'day_name',
+            'id', 'resource', 'day_of_week', 'day_name',
             'start_time', 'end_time', 'is_active',
             'allows_virtual', 'allows_in_person'
         ]
@@ -182,7 +268,7 @@ class ExceptionDateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExceptionDate
         fields = [
-            'id', 'date', 'exception_type', 'type_display',
+            'id', 'resource', 'date', 'exception_type', 'type_display',
             'reason', 'start_time', 'end_time'
         ]
 
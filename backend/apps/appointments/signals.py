@@ -2,20 +2,38 @@
 Appointment signals for automatic actions.
 """
 
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
 import logging
 
-from .models import Appointment
+from apps.core.realtime import publish_appointment_created, publish_status_changes
+from .cache import invalidate_lookups, bump_availability
+from .models import Appointment, Patient, Resource, WeeklyAvailability, ExceptionDate
 
 logger = logging.getLogger(__name__)
 
+# Sent whenever appointments change status, including set-based updates that
+# bypass post_save. `changes` is a list of dicts with id, reference_id,
+# patient_id, previous_status, status and scheduled_date.
+appointment_status_transition = Signal()
+
+
+def build_status_change(appointment_id, reference_id, patient_id, previous_status, status, scheduled_date):
+    return {
+        'id': appointment_id,
+        'reference_id': reference_id,
+        'patient_id': patient_id,
+        'previous_status': previous_status,
+        'status': status,
+        'scheduled_date': scheduled_date,
+    }
+
 
 @receiver(post_save, sender=Appointment)
 def appointment_status_changed(sender, instance, created, **kwargs):
     """Handle appointment status changes and log activity."""
     from apps.core.models import ActivityLog
-    
+
     if created:
         logger.info(f"New appointment created: {instance.reference_id}")
         # Log new appointment creation
@@ -31,5 +49,74 @@ def appointment_status_changed(sender, instance, created, **kwargs):
             },
             related_object=instance
         )
+        if instance.patient_id:
+            Patient.record_booking(instance.patient_id, instance.modality)
+        publish_appointment_created(instance)
+        if instance.status in Appointment.SLOT_HOLDING_STATUSES:
+            bump_availability()
     else:
         logger.info(f"Appointment {instance.reference_id} updated to status: {instance.status}")
+        previous_status = getattr(instance, '_loaded_status', None)
+        if previous_status == instance.status:
+            invalidate_lookups([instance.reference_id])
+        else:
+            appointment_status_transition.send(sender=Appointment, changes=[build_status_change(
+                instance.id,
+                instance.reference_id,
+                instance.patient_id,
+                previous_status,
+                instance.status,
+                instance.scheduled_date,
+            )])
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or Appointment.SCHEDULING_FIELDS & set(update_fields):
+            bump_availability()
+        
+        previous_modality = getattr(instance, '_loaded_modality', None)
+        modality = instance.__dict__.get('modality')
+        if instance.patient_id and previous_modality and modality and previous_modality != modality:
+            Patient.record_modality_change(instance.patient_id, previous_modality, modality)
+
+    instance._loaded_status = instance.status
+    instance._loaded_modality = instance.__dict__.get('modality')
+
+
+@receiver(appointment_status_transition)
+def update_patient_stats(sender, changes, **kwargs):
+    """Keep the per-patient aggregate cache in step with status changes."""
+    Patient.apply_status_changes(changes)
+
+
+@receiver(appointment_status_transition)
+def push_status_changes(sender, changes, **kwargs):
+    """Relay status changes to the admin dashboard stream."""
+    publish_status_changes(changes)
+
+
+@receiver(appointment_status_transition)
+def invalidate_lookup_cache(sender, changes, **kwargs):
+    """Drop cached guest lookups for appointments whose status changed."""
+    invalidate_lookups([change['reference_id'] for change in changes])
+
+
+@receiver(appointment_status_transition)
+def invalidate_availability_cache(sender, changes, **kwargs):
+    """Bump the availability cache once if any change freed or took a slot."""
+    holding = Appointment.SLOT_HOLDING_STATUSES
+    if any((change['previous_status'] in holding) != (change['status'] in holding) for change in changes):
+        bump_availability()
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    invalidate_lookups([instance.reference_id])
+    if instance.status in Appointment.SLOT_HOLDING_STATUSES:
+        bump_availability()
+
+
+@receiver([post_save, post_delete], sender=Resource)
+@receiver([post_save, post_delete], sender=WeeklyAvailability)
+@receiver([post_save, post_delete], sender=ExceptionDate)
+def schedule_changed(sender, **kwargs):
+    bump_availability()
@@ -7,13 +7,13 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from icalendar import Calendar, Event
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def send_booking_confirmation(self, appointment_id):
     """Send booking confirmation email to patient."""
     try:
@@ -71,7 +71,7 @@ Best regards,
         raise self.retry(exc=e, countdown=60)
 
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def send_appointment_approved(self, appointment_id):
     """Send approval email with calendar invite."""
     try:
@@ -89,8 +89,8 @@ def send_appointment_approved(self, appointment_id):
         event = Event()
         event.add('summary', f"Medical Appointment - {settings.CLINIC_NAME}")
         
-        # Combine date and time
-        start_dt = datetime.combine(appointment.scheduled_date, appointment.scheduled_time)
+        # Clinic-local start as a UTC instant, so calendars place it correctly
+        start_dt = appointment.starts_at.astimezone(dt_timezone.utc)
         end_dt = start_dt + timedelta(minutes=appointment.duration_minutes)
         
         event.add('dtstart', start_dt)
@@ -158,7 +158,7 @@ Best regards,
         raise self.retry(exc=e, countdown=60)
 
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def send_appointment_rejected(self, appointment_id, reason=''):
     """Send rejection email asking patient to reschedule."""
     try:
@@ -201,13 +201,78 @@ Best regards,
         raise self.retry(exc=e, countdown=60)
 
 
-@shared_task
+@shared_task(bind=True, max_retries=3, ignore_result=True)
+def send_appointment_rescheduled(self, appointment_id, previous_date, previous_time):
+    """Send a single email confirming the move to the new slot."""
+    try:
+        from .models import Appointment
+        appointment = Appointment.objects.select_related('service').get(id=appointment_id)
+        previous = datetime.fromisoformat(f"{previous_date}T{previous_time}")
+        
+        subject = f"Appointment Rescheduled - {settings.CLINIC_NAME}"
+        
+        message = f"""
+Dear {appointment.patient_name},
+
+Your appointment has been moved from {previous.strftime('%B %d, %Y')} at {previous.strftime('%I:%M %p')}.
+
+New Appointment Details:
+- Reference ID: {appointment.reference_id}
+- Date: {appointment.scheduled_date.strftime('%B %d, %Y')}
+- Time: {appointment.scheduled_time.strftime('%I:%M %p')}
+- Type: {appointment.get_modality_display()}
+{f'- Service: {appointment.service.title}' if appointment.service else ''}
+
+Your new time is pending approval. You will receive a confirmation email once it is approved.
+
+If you have any questions, please contact us at {settings.CLINIC_PHONE} or {settings.CLINIC_EMAIL}.
+
+Best regards,
+{settings.CLINIC_NAME}
+        """
+        
+        send_mail(
+            subject=subject,
+            message=message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[appointment.patient_email],
+            fail_silently=False,
+        )
+        
+        logger.info(f"Reschedule email sent for appointment {appointment.reference_id}")
+        
+    except Exception as e:
+        logger.error(f"Failed to send reschedule email: {e}")
+        raise self.retry(exc=e, countdown=60)
+
+
+@shared_task(ignore_result=True)
+def send_bulk_appointment_notifications(appointment_ids, action, reason=''):
+    """
+    Fan out notification emails for a bulk admin action.
+    The request publishes this one job; per-appointment emails keep their own retries
+    and stay on the bulk queue so they never delay transactional email.
+    """
+    from celery import group
+    
+    if action == 'approve':
+        signatures = [send_appointment_approved.s(pk) for pk in appointment_ids]
+    elif action == 'reject':
+        signatures = [send_appointment_rejected.s(pk, reason) for pk in appointment_ids]
+    else:
+        return
+    
+    group(signatures).apply_async(queue='bulk')
+    logger.info(f"Queued {len(signatures)} {action} notifications")
+
+
+@shared_task(ignore_result=True)
 def send_appointment_reminders():
     """Send reminder emails for appointments tomorrow."""
     from .models import Appointment
-    from django.utils import timezone
+    from apps.core.utils import clinic_today
     
-    tomorrow = timezone.now().date() + timedelta(days=1)
+    tomorrow = clinic_today() + timedelta(days=1)
     
     appointments = Appointment.objects.filter(
         scheduled_date=tomorrow,
@@ -255,21 +320,168 @@ Best regards,
             logger.error(f"Failed to send reminder for {appointment.reference_id}: {e}")
 
 
+def _transition_in_batches(filters, resolve_status, reason, auto_closed=False):
+    """
+    Set-based status transitions over the (status, scheduled_date) index.
+    Matching rows are taken in batches of APPOINTMENT_CLEANUP_BATCH_SIZE,
+    each batch in its own transaction: rows are locked (skipping ones held
+    by other writers), updated with one UPDATE per target status, logged
+    with one bulk insert and announced with one status-transition signal
+    (patient stats, lookup and availability caches, dashboard stream).
+    With auto_closed the rows are flagged as imputed outcomes.
+    Returns a Counter of new statuses.
+    """
+    from collections import Counter, defaultdict
+    from django.db import transaction
+    from django.utils import timezone
+    from apps.core.models import ActivityLog
+    from .models import Appointment
+    from .signals import appointment_status_transition, build_status_change
+    
+    log_types = {
+        Appointment.Status.CANCELLED: ActivityLog.ActionType.APPOINTMENT_CANCELLED,
+        Appointment.Status.COMPLETED: ActivityLog.ActionType.APPOINTMENT_COMPLETED,
+        Appointment.Status.NO_SHOW: ActivityLog.ActionType.APPOINTMENT_NO_SHOW,
+    }
+    batch_size = getattr(settings, 'APPOINTMENT_CLEANUP_BATCH_SIZE', 500)
+    
+    totals = Counter()
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Appointment.objects.select_for_update(skip_locked=True).filter(
+                    filters
+                ).order_by('scheduled_date', 'id').values(
+                    'id', 'reference_id', 'status', 'patient_id',
+                    'patient_details', 'scheduled_date', 'modality'
+                )[:batch_size]
+            )
+            if not rows:
+                return totals
+            
+            ids_by_status = defaultdict(list)
+            for row in rows:
+                row['new_status'] = resolve_status(row)
+                ids_by_status[row['new_status']].append(row['id'])
+            
+            now = timezone.now()
+            for status, ids in ids_by_status.items():
+                Appointment.objects.filter(id__in=ids).update(
+                    status=status, auto_closed=auto_closed, updated_at=now
+                )
+            
+            logs = []
+            for row in rows:
+                details = row['patient_details'] or {}
+                entry = ActivityLog.build(
+                    action_type=log_types[row['new_status']],
+                    description=f"{reason.capitalize()}: {Appointment.Status(row['new_status']).label.lower()} "
+                                f"for {details.get('name', 'Unknown')}",
+                    metadata={
+                        'reference_id': row['reference_id'],
+                        'patient_email': details.get('email', ''),
+                        'scheduled_date': row['scheduled_date'].isoformat(),
+                        'reason': reason,
+                        'automated': True,
+                    },
+                )
+                entry.related_object_type = Appointment.__name__
+                entry.related_object_id = row['id']
+                logs.append(entry)
+            ActivityLog.save_entries(logs)
+            
+            appointment_status_transition.send(sender=Appointment, changes=[
+                build_status_change(
+                    row['id'], row['reference_id'], row['patient_id'],
+                    row['status'], row['new_status'], row['scheduled_date']
+                )
+                for row in rows
+            ])
+        
+        totals.update(row['new_status'] for row in rows)
+
+
 @shared_task
 def cleanup_expired_pending():
-    """Clean up pending appointments that are past their scheduled date."""
+    """
+    Cancel pending appointments that are past their scheduled date,
+    in batches (see _transition_in_batches). Overlapping runs skip.
+    """
+    from django.db.models import Q
+    from apps.core.tasks import task_lock
+    from apps.core.utils import clinic_today
     from .models import Appointment
+    
+    yesterday = clinic_today() - timedelta(days=1)
+    
+    with task_lock('cleanup-expired-pending') as acquired:
+        if not acquired:
+            logger.info("Expired pending cleanup already running; skipping")
+            return 0
+        
+        totals = _transition_in_batches(
+            Q(status=Appointment.Status.PENDING, scheduled_date__lt=yesterday),
+            lambda row: Appointment.Status.CANCELLED,
+            'expired pending request'
+        )
+        
+        total = sum(totals.values())
+        if total:
+            logger.info(f"Cancelled {total} expired pending appointments")
+        return total
+
+
+@shared_task
+def close_past_appointments():
+    """
+    Close approved appointments once APPOINTMENT_AUTO_CLOSE_GRACE_HOURS
+    have passed since their start: each becomes the status
+    APPOINTMENT_AUTO_CLOSE_STATUS maps its modality to (completed or
+    no_show). The rows are flagged auto_closed so the demand forecast
+    does not treat the imputed outcome as observed; an admin correcting
+    or confirming the outcome clears the flag.
+    """
+    from django.db.models import Q
     from django.utils import timezone
+    from apps.core.tasks import task_lock
+    from apps.core.utils import clinic_timezone
+    from .models import Appointment
     
-    yesterday = timezone.now().date() - timedelta(days=1)
+    if not getattr(settings, 'APPOINTMENT_AUTO_CLOSE_ENABLED', True):
+        return {}
     
-    expired = Appointment.objects.filter(
-        status=Appointment.Status.PENDING,
-        scheduled_date__lt=yesterday
-    )
+    policy = getattr(settings, 'APPOINTMENT_AUTO_CLOSE_STATUS', {})
+    targets = {
+        modality: Appointment.Status(policy.get(modality, Appointment.Status.COMPLETED))
+        for modality in Appointment.Modality.values
+    }
+    grace = timedelta(hours=getattr(settings, 'APPOINTMENT_AUTO_CLOSE_GRACE_HOURS', 4))
+    cutoff = timezone.localtime(timezone.now(), clinic_timezone()) - grace
     
-    count = expired.count()
-    expired.update(status=Appointment.Status.CANCELLED)
+    with task_lock('close-past-appointments') as acquired:
+        if not acquired:
+            logger.info("Past appointment closing already running; skipping")
+            return {}
+        
+        totals = _transition_in_batches(
+            Q(status=Appointment.Status.APPROVED) & (
+                Q(scheduled_date__lt=cutoff.date()) |
+                Q(scheduled_date=cutoff.date(), scheduled_time__lte=cutoff.time())
+            ),
+            lambda row: targets[row['modality']],
+            'auto-closed after appointment time',
+            auto_closed=True
+        )
+        
+        closed = {str(status): count for status, count in totals.items()}
+        if closed:
+            logger.info(f"Closed past appointments: {closed}")
+        return closed
+
+
+@shared_task
+def generate_demand_forecast():
+    """Rebuild per hour-of-week demand and no-show forecasts from history."""
+    from .forecast import build_demand_forecast
     
-    if count:
-        logger.info(f"Cancelled {count} expired pending appointments")
+    return build_demand_forecast()
@@ -9,10 +9,13 @@ from .views import (
     AvailableSlotsView,
     AvailableDatesView,
     BookAppointmentView,
+    SlotHoldView,
     AppointmentLookupView,
     CancelAppointmentView,
+    RescheduleAppointmentView,
     AppointmentAdminViewSet,
     WeeklyAvailabilityViewSet,
+    ResourceViewSet,
     ExceptionDateViewSet,
 )
 
@@ -23,14 +26,18 @@ admin_router = DefaultRouter()
 admin_router.register(r'appointments', AppointmentAdminViewSet, basename='admin-appointment')
 admin_router.register(r'availability', WeeklyAvailabilityViewSet, basename='admin-availability')
 admin_router.register(r'exceptions', ExceptionDateViewSet, basename='admin-exception')
+admin_router.register(r'resources', ResourceViewSet, basename='admin-resource')
 
 urlpatterns = [
     # Public booking endpoints
     path('slots/', AvailableSlotsView.as_view(), name='available-slots'),
     path('dates/', AvailableDatesView.as_view(), name='available-dates'),
+    path('holds/', SlotHoldView.as_view(), name='slot-hold'),
+    path('holds/<str:token>/', SlotHoldView.as_view(), name='slot-hold-release'),
     path('book/', BookAppointmentView.as_view(), name='book'),
     path('lookup/<str:reference_id>/', AppointmentLookupView.as_view(), name='lookup'),
     path('cancel/<str:reference_id>/', CancelAppointmentView.as_view(), name='cancel'),
+    path('reschedule/<str:reference_id>/', RescheduleAppointmentView.as_view(), name='reschedule'),
     
     # Admin endpoints
     path('admin/', include(admin_router.urls)),
@@ -7,33 +7,77 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.throttling import ScopedRateThrottle
+from django.core.cache import cache
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
+from django.utils.decorators import method_decorator
 from datetime import timedelta
 from django_filters.rest_framework import DjangoFilterBackend
 
 from apps.core.middleware import RateLimitMiddleware
+from apps.core.models import ActivityLog
+from apps.core.utils import clinic_today
+from apps.core.pagination import AppointmentKeysetPagination
 from apps.services.models import Service
 from apps.users.models import User
-from .models import Appointment, WeeklyAvailability, ExceptionDate
+from .models import Appointment, Resource, WeeklyAvailability, ExceptionDate
 from .serializers import (
     BookingRequestSerializer,
     AppointmentListSerializer,
     AppointmentDetailSerializer,
     AppointmentAdminSerializer,
     AppointmentActionSerializer,
+    RescheduleRequestSerializer,
+    SlotHoldSerializer,
     AvailableSlotsSerializer,
     TimeSlotSerializer,
     WeeklyAvailabilitySerializer,
     ExceptionDateSerializer,
+    ResourceSerializer,
 )
-from .availability import AvailabilityEngine, get_available_dates
-from .tasks import send_booking_confirmation, send_appointment_approved
+from .availability import AvailabilityEngine, get_available_dates, localize_instants, to_minutes
+from .cache import (
+    get_cached_lookup,
+    cache_lookup,
+    availability_cache_key,
+    cache_availability,
+)
+from .overbooking import record_overbooking
+from .holds import (
+    place_hold,
+    matching_hold,
+    release_hold,
+    release_hold_on_commit,
+    hold_expires_at,
+    client_hold_count,
+    max_holds_per_client,
+)
+from .tasks import send_booking_confirmation, send_appointment_approved, send_appointment_rescheduled
+
+
+def localize_slots(grouped_slots, tz):
+    """
+    Copy of grouped slot payloads with each slot's start in the visitor's
+    timezone added as local_date/local_time. Converts each date's run of
+    UTC instants in one pass.
+    """
+    localized = {}
+    for date_str, day_slots in grouped_slots.items():
+        local_starts = localize_instants([slot['starts_at'] for slot in day_slots], tz)
+        localized[date_str] = [
+            {**slot, 'local_date': local.date().isoformat(), 'local_time': local.strftime('%H:%M')}
+            for slot, local in zip(day_slots, local_starts)
+        ]
+    return localized
 
 
 class AvailableSlotsView(APIView):
-    """Get available booking slots."""
+    """
+    Get available booking slots.
+    Times are clinic-local; pass `timezone` to also get each slot in the
+    visitor's timezone.
+    """
     permission_classes = [AllowAny]
     
     def get(self, request):
@@ -43,55 +87,86 @@ class AvailableSlotsView(APIView):
         data = serializer.validated_data
         
         # Single-clinic mode - doctor_id is optional
-        engine = AvailabilityEngine()
-        slots = engine.get_available_slots(
-            start_date=data.get('start_date'),
-            end_date=data.get('end_date'),
-            modality=data.get('modality')
+        engine = AvailabilityEngine(duration_minutes=data['duration_minutes'])
+        start_date, end_date = engine.booking_window(data.get('start_date'), data.get('end_date'))
+        cache_key = availability_cache_key(
+            'slots', clinic_today(), start_date, end_date, data.get('modality'),
+            data['duration_minutes'],
+            dates=[start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
         )
+        payload = cache.get(cache_key)
+        if payload is None:
+            days = engine.get_available_days(
+                start_date=start_date,
+                end_date=end_date,
+                modality=data.get('modality')
+            )
+            
+            # Group slots by date; TimeSlots are only built here
+            grouped_slots = {}
+            total_slots = 0
+            for day in days:
+                grouped_slots[day.date.isoformat()] = [
+                    {
+                        'start_time': slot.start_time.strftime('%H:%M'),
+                        'end_time': slot.end_time.strftime('%H:%M'),
+                        'starts_at': slot.starts_at,
+                        'modality': list(slot.modality),
+                        'capacity': slot.capacity,
+                    }
+                    for slot in day.slots()
+                ]
+                total_slots += len(day)
+            
+            payload = {
+                'slots': grouped_slots,
+                'total_slots': total_slots
+            }
+            cache_availability(cache_key, payload)
         
-        # Group slots by date
-        grouped_slots = {}
-        for slot in slots:
-            date_str = slot.date.isoformat()
-            if date_str not in grouped_slots:
-                grouped_slots[date_str] = []
-            grouped_slots[date_str].append({
-                'start_time': slot.start_time.strftime('%H:%M'),
-                'end_time': slot.end_time.strftime('%H:%M'),
-                'modality': slot.modality,
-            })
+        if data.get('timezone'):
+            payload = {
+                **payload,
+                'timezone': data['timezone'].key,
+                'slots': localize_slots(payload['slots'], data['timezone']),
+            }
         
         return Response({
             'success': True,
-            'data': {
-                'slots': grouped_slots,
-                'total_slots': len(slots)
-            }
+            'data': payload
         })
 
 
 class AvailableDatesView(APIView):
-    """Get dates that have available slots."""
+    """
+    Get dates that have available slots, with free-slot counts per
+    modality for each date. Short-lived slot holds are not subtracted.
+    """
     permission_classes = [AllowAny]
     
     def get(self, request):
         # Single-clinic mode - no doctor_id needed
         days = int(request.query_params.get('days', 30))
         
-        engine = AvailabilityEngine()
-        today = timezone.now().date()
-        start_date = today + timedelta(days=1)
-        end_date = today + timedelta(days=days)
-        
-        slots = engine.get_available_slots(start_date, end_date)
-        available_dates = sorted(set(slot.date for slot in slots))
+        today = clinic_today()
+        cache_key = availability_cache_key('dates', today, days)
+        payload = cache.get(cache_key)
+        if payload is None:
+            engine = AvailabilityEngine()
+            start_date = today + timedelta(days=1)
+            end_date = today + timedelta(days=days)
+            
+            counts = engine.get_free_counts(start_date, end_date)
+            
+            payload = {
+                'dates': [d.isoformat() for d, _ in counts],
+                'counts': {d.isoformat(): day_counts for d, day_counts in counts},
+            }
+            cache_availability(cache_key, payload)
         
         return Response({
             'success': True,
-            'data': {
-                'dates': [d.isoformat() for d in available_dates]
-            }
+            'data': payload
         })
 
 
@@ -121,9 +196,21 @@ class BookAppointmentView(APIView):
         
         data = serializer.validated_data
         
-        # Lock and verify slot availability (single-clinic mode)
-        engine = AvailabilityEngine()
-        if not engine.lock_slot(data['scheduled_date'], data['scheduled_time'], data['modality']):
+        # Get service if provided
+        service = None
+        if data.get('service_id'):
+            service = get_object_or_404(Service, id=data['service_id'])
+        
+        # Lock and verify the whole service duration is free (single-clinic mode)
+        engine = AvailabilityEngine(duration_minutes=service.duration_minutes if service else None)
+        hold = matching_hold(
+            data.get('hold_token'), data['scheduled_date'], to_minutes(data['scheduled_time'])
+        )
+        free_resources = engine.lock_slot(
+            data['scheduled_date'], data['scheduled_time'], data['modality'],
+            exclude_hold=hold['token'] if hold else None
+        )
+        if not free_resources:
             return Response({
                 'success': False,
                 'error': {
@@ -132,14 +219,14 @@ class BookAppointmentView(APIView):
                 }
             }, status=409)
         
-        # Get service if provided
-        service = None
-        if data.get('service_id'):
-            service = get_object_or_404(Service, id=data['service_id'])
+        # Book the held practitioner/room, else the first free one
+        resource_id = free_resources[0]
+        if hold and hold['resource_id'] in free_resources:
+            resource_id = hold['resource_id']
         
-        # Create appointment (single-clinic mode - no doctor assignment)
         appointment = Appointment.objects.create(
             service=service,
+            resource_id=resource_id,
             patient_type=data['patient_type'],
             patient_details=data['patient_details'],
             scheduled_date=data['scheduled_date'],
@@ -150,6 +237,10 @@ class BookAppointmentView(APIView):
             reason=data.get('reason', ''),
             status=Appointment.Status.PENDING,
         )
+        if appointment.resource_id in engine.overbooked:
+            record_overbooking(appointment)
+        if hold:
+            release_hold_on_commit(hold['token'])
         
         # Trigger confirmation email (async)
         send_booking_confirmation.delay(appointment.id)
@@ -164,17 +255,105 @@ class BookAppointmentView(APIView):
         }, status=201)
 
 
-class AppointmentLookupView(APIView):
-    """Look up appointment by reference ID (for guests)."""
+class SlotHoldView(APIView):
+    """
+    Hold a slot for SLOT_HOLD_SECONDS while the visitor completes the
+    booking form. Pass the returned hold_token to /book/; held time is
+    hidden from /slots/ for everyone else. Rate limited per client, and a
+    client may keep at most SLOT_HOLD_MAX_PER_CLIENT live holds.
+    """
     permission_classes = [AllowAny]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'slot_hold'
     
-    def get(self, request, reference_id):
-        appointment = get_object_or_404(Appointment, reference_id=reference_id.upper())
+    @transaction.atomic
+    def post(self, request):
+        serializer = SlotHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        data = serializer.validated_data
+        
+        client = ScopedRateThrottle().get_ident(request)
+        if client_hold_count(client) >= max_holds_per_client():
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'TOO_MANY_HOLDS',
+                    'message': 'Too many slots are on hold. Release one before holding another.'
+                }
+            }, status=429)
+        
+        engine = AvailabilityEngine(duration_minutes=data['duration_minutes'])
+        start = to_minutes(data['scheduled_time'])
+        
+        # Another visitor may claim a resource between the check and the
+        # claim; fall through to the next free one
+        hold = None
+        for resource_id in engine.lock_slot(data['scheduled_date'], data['scheduled_time'], data['modality']):
+            hold = place_hold(
+                data['scheduled_date'], resource_id, start, engine.duration, engine.slot_duration, client=client
+            )
+            if hold:
+                break
+        
+        if hold is None:
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'SLOT_UNAVAILABLE',
+                    'message': 'This time slot is no longer available. Please select another time.'
+                }
+            }, status=409)
         
         return Response({
             'success': True,
-            'data': AppointmentDetailSerializer(appointment).data
-        })
+            'data': {
+                'hold_token': hold['token'],
+                'expires_at': hold_expires_at(hold).isoformat(),
+                'scheduled_date': data['scheduled_date'].isoformat(),
+                'scheduled_time': data['scheduled_time'].strftime('%H:%M'),
+                'modality': data['modality'],
+            }
+        }, status=201)
+    
+    def delete(self, request, token=None):
+        """Release a hold early (visitor picked another slot or left)."""
+        if not token or not release_hold(token):
+            return Response({
+                'success': False,
+                'error': {'code': 'NOT_FOUND', 'message': 'Hold not found or already expired.'}
+            }, status=404)
+        return Response({'success': True})
+
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class AppointmentLookupView(APIView):
+    """
+    Look up appointment by reference ID (for guests).
+    Served from the lookup cache when possible; honours If-None-Match.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request, reference_id):
+        entry = get_cached_lookup(reference_id)
+        if entry is None:
+            appointment = get_object_or_404(
+                Appointment.objects.select_related('service', 'service__category'),
+                reference_id=reference_id.upper()
+            )
+            entry = cache_lookup(appointment, AppointmentDetailSerializer(appointment).data)
+        
+        if_none_match = request.headers.get('If-None-Match', '')
+        if entry['etag'] in [tag.strip() for tag in if_none_match.split(',')]:
+            response = Response(status=304)
+        else:
+            response = Response({
+                'success': True,
+                'data': entry['data']
+            })
+        response['ETag'] = entry['etag']
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
 
 class CancelAppointmentView(APIView):
@@ -202,11 +381,104 @@ class CancelAppointmentView(APIView):
         })
 
 
+class RescheduleAppointmentView(APIView):
+    """
+    Move an appointment to a new slot by reference ID (for guests).
+    The old slot is released and the new one taken in a single transaction.
+    """
+    permission_classes = [AllowAny]
+    throttle_scope = 'booking'
+    
+    @transaction.atomic
+    def post(self, request, reference_id):
+        appointment = get_object_or_404(
+            Appointment.objects.select_for_update(),
+            reference_id=reference_id.upper()
+        )
+        
+        if not appointment.can_reschedule:
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'CANNOT_RESCHEDULE',
+                    'message': 'This appointment cannot be rescheduled.'
+                }
+            }, status=400)
+        
+        serializer = RescheduleRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        modality = data.get('modality', appointment.modality)
+        
+        if (data['scheduled_date'], data['scheduled_time']) == (appointment.scheduled_date, appointment.scheduled_time):
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'SAME_SLOT',
+                    'message': 'Please choose a different time.'
+                }
+            }, status=400)
+        
+        engine = AvailabilityEngine(duration_minutes=appointment.duration_minutes)
+        free_resources = engine.lock_slot(
+            data['scheduled_date'], data['scheduled_time'], modality,
+            exclude_appointment_id=appointment.id
+        )
+        if not free_resources:
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'SLOT_UNAVAILABLE',
+                    'message': 'This time slot is no longer available. Please select another time.'
+                }
+            }, status=409)
+        
+        previous_date = appointment.scheduled_date
+        previous_time = appointment.scheduled_time
+        # Stay with the same practitioner/room when they are free
+        resource_id = appointment.resource_id
+        if resource_id not in free_resources or resource_id in engine.overbooked:
+            resource_id = free_resources[0]
+        appointment.reschedule(
+            data['scheduled_date'],
+            data['scheduled_time'],
+            modality=modality,
+            timezone_name=data.get('timezone'),
+            resource_id=resource_id
+        )
+        if resource_id in engine.overbooked:
+            record_overbooking(appointment)
+        
+        ActivityLog.log(
+            action_type=ActivityLog.ActionType.APPOINTMENT_RESCHEDULED,
+            description=f"{appointment.patient_name} rescheduled to {appointment.scheduled_date.strftime('%b %d')} at {appointment.scheduled_time.strftime('%H:%M')}",
+            metadata={
+                'reference_id': appointment.reference_id,
+                'previous_date': previous_date.isoformat(),
+                'previous_time': previous_time.strftime('%H:%M'),
+                'scheduled_date': appointment.scheduled_date.isoformat(),
+                'scheduled_time': appointment.scheduled_time.strftime('%H:%M'),
+            },
+            related_object=appointment
+        )
+        
+        transaction.on_commit(lambda: send_appointment_rescheduled.delay(
+            appointment.id, previous_date.isoformat(), previous_time.isoformat()
+        ))
+        
+        return Response({
+            'success': True,
+            'message': 'Appointment rescheduled successfully.',
+            'data': AppointmentDetailSerializer(appointment).data
+        })
+
+
 # Admin Views
 class AppointmentAdminViewSet(viewsets.ModelViewSet):
     """Admin viewset for appointment management."""
     serializer_class = AppointmentAdminSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = AppointmentKeysetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'scheduled_date', 'modality']
     
@@ -220,7 +492,7 @@ class AppointmentAdminViewSet(viewsets.ModelViewSet):
         elif status_group == 'upcoming':
             queryset = queryset.filter(
                 status=Appointment.Status.APPROVED,
-                scheduled_date__gte=timezone.now().date()
+                scheduled_date__gte=clinic_today()
             )
         
         return queryset
@@ -273,12 +545,21 @@ class WeeklyAvailabilityViewSet(viewsets.ModelViewSet):
         return WeeklyAvailability.objects.all()
 
 
+class ResourceViewSet(viewsets.ModelViewSet):
+    """Admin viewset for managing practitioners and rooms."""
+    serializer_class = ResourceSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get_queryset(self):
+        return Resource.objects.all()
+
+
 class ExceptionDateViewSet(viewsets.ModelViewSet):
     """Admin viewset for managing exception dates."""
     serializer_class = ExceptionDateSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['date', 'exception_type']
+    filterset_fields = ['date', 'exception_type', 'resource']
     
     def get_queryset(self):
         return ExceptionDate.objects.all()
@@ -0,0 +1,102 @@
+"""
+Buffered activity logging.
+
+ActivityLog.log() normally INSERTs immediately. Inside a buffer scope
+(one per HTTP request via ActivityLogBufferMiddleware, one per Celery
+task via the task signals below) entries are collected instead and
+written with a single bulk_create when the scope ends. Entries logged
+inside a transaction join the buffer only when it commits, so a rolled
+back block (or savepoint) leaves no entries about rows that never existed.
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from celery.signals import task_prerun, task_postrun
+
+logger = logging.getLogger(__name__)
+
+_buffer = ContextVar('activity_log_buffer', default=None)
+
+# Celery task_id -> ContextVar token, so postrun can close the scope prerun opened
+_task_tokens = {}
+
+
+def buffer_entry(entry):
+    """
+    Queue an unsaved ActivityLog entry on the active buffer.
+    Returns False when no buffer is active and the caller should save directly.
+    """
+    entries = _buffer.get()
+    if entries is None:
+        return False
+    
+    if not transaction.get_connection().in_atomic_block:
+        entries.append(entry)
+        return True
+    
+    def _add():
+        # The scope may have closed before an outer transaction committed
+        if _buffer.get() is entries:
+            entries.append(entry)
+        else:
+            _save_entries([entry])
+    
+    transaction.on_commit(_add)
+    return True
+
+
+def start_buffer():
+    """Open a new buffer scope and return the token needed to close it."""
+    return _buffer.set([])
+
+
+def flush_buffer(token, discard=False):
+    """
+    Close the buffer scope opened with `token`.
+    Writes the collected entries with one bulk_create unless `discard` is set.
+    """
+    entries = _buffer.get() or []
+    _buffer.reset(token)
+
+    if discard or not entries:
+        return 0
+    return _save_entries(entries)
+
+
+def _save_entries(entries):
+    from .models import ActivityLog
+    try:
+        ActivityLog.save_entries(entries)
+    except Exception as e:
+        # Activity is an audit aid; never fail the request because of it
+        logger.error(f"Failed to flush {len(entries)} activity log entries: {e}")
+        return 0
+    return len(entries)
+
+
+@contextmanager
+def buffered_activity():
+    """Collect activity log entries for the enclosed block and flush them at exit."""
+    token = start_buffer()
+    try:
+        yield
+    except Exception:
+        flush_buffer(token, discard=True)
+        raise
+    flush_buffer(token)
+
+
+@task_prerun.connect
+def _open_task_buffer(task_id=None, **kwargs):
+    _task_tokens[task_id] = start_buffer()
+
+
+@task_postrun.connect
+def _flush_task_buffer(task_id=None, state=None, **kwargs):
+    token = _task_tokens.pop(task_id, None)
+    if token is not None:
+        flush_buffer(token, discard=state == 'FAILURE')
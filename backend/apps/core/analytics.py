@@ -0,0 +1,300 @@
+"""
+Capacity-utilization and demand-forecast analytics for the admin dashboard.
+
+Open time comes from WeeklyAvailability blocks expanded over the date range,
+minus ExceptionDate closures. Appointment time comes from one grouped query
+(resource, weekday, start, duration, status). Both are spread over
+hour-of-week cells in minutes, so long appointments and partial hours are
+counted exactly.
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import ExtractIsoWeekDay
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.appointments.availability import to_minutes
+from apps.appointments.overbooking import (
+    overbooking_enabled,
+    overbookable_hours,
+    overbooking_counts,
+    max_per_slot,
+)
+from apps.appointments.models import Appointment, WeeklyAvailability, ExceptionDate, DemandForecast
+from apps.core.utils import clinic_today
+
+UTILIZATION_MAX_DAYS = 366
+
+BOOKED_STATUSES = (
+    Appointment.Status.PENDING,
+    Appointment.Status.APPROVED,
+    Appointment.Status.COMPLETED,
+)
+
+METRICS = ('capacity', 'blocked', 'booked', 'no_show')
+
+
+def spread_by_hour(start, end):
+    """Split minutes [start, end) of a day into (hour, minutes) pieces."""
+    while start < end:
+        hour_end = min(end, (start // 60 + 1) * 60)
+        yield start // 60, hour_end - start
+        start = hour_end
+
+
+def overlap(start, end, other_start, other_end):
+    return max(0, min(end, other_end) - max(start, other_start))
+
+
+def weekday_occurrences(start_date, end_date):
+    """How many times each weekday (0=Monday) occurs in the range."""
+    days = (end_date - start_date).days + 1
+    weeks, extra = divmod(days, 7)
+    counts = [weeks] * 7
+    for offset in range(extra):
+        counts[(start_date.weekday() + offset) % 7] += 1
+    return counts
+
+
+def closed_ranges(block_start, block_end, exception):
+    """Parts of a block an exception closes, as minute ranges."""
+    if exception.exception_type == ExceptionDate.ExceptionType.BLOCKED:
+        return [(block_start, block_end)]
+    if exception.start_time is None or exception.end_time is None:
+        return []
+    window_start, window_end = to_minutes(exception.start_time), to_minutes(exception.end_time)
+    return [
+        (start, end)
+        for start, end in ((block_start, min(block_end, window_start)), (max(block_start, window_end), block_end))
+        if start < end
+    ]
+
+
+def build_utilization(start_date, end_date):
+    """
+    Utilization per WeeklyAvailability block and per hour-of-week cell, in
+    minutes: capacity (scheduled open time), blocked (closed by exceptions),
+    booked (pending/approved/completed), no_show, free and utilization %.
+    """
+    blocks = list(
+        WeeklyAvailability.objects.filter(is_active=True).select_related('resource')
+        .order_by('day_of_week', 'start_time')
+    )
+    occurrences = weekday_occurrences(start_date, end_date)
+    
+    block_totals = {block.id: Counter() for block in blocks}
+    hour_totals = defaultdict(Counter)
+    blocks_by_day = defaultdict(list)
+    
+    for block in blocks:
+        start, end = to_minutes(block.start_time), to_minutes(block.end_time)
+        weeks = occurrences[block.day_of_week]
+        block_totals[block.id]['capacity'] += (end - start) * weeks
+        for hour, minutes in spread_by_hour(start, end):
+            hour_totals[(block.day_of_week, hour)]['capacity'] += minutes * weeks
+        blocks_by_day[(block.resource_id, block.day_of_week)].append((block, start, end))
+    
+    # Closures: clinic-wide exceptions apply to every block that day
+    exceptions = ExceptionDate.objects.filter(date__gte=start_date, date__lte=end_date)
+    for exception in exceptions:
+        weekday = exception.date.weekday()
+        for (resource_id, day), day_blocks in blocks_by_day.items():
+            if day != weekday or exception.resource_id not in (None, resource_id):
+                continue
+            for block, start, end in day_blocks:
+                for closed_start, closed_end in closed_ranges(start, end, exception):
+                    block_totals[block.id]['blocked'] += closed_end - closed_start
+                    for hour, minutes in spread_by_hour(closed_start, closed_end):
+                        hour_totals[(weekday, hour)]['blocked'] += minutes
+    
+    # Booked time: one grouped query, rows per distinct start/duration/status
+    rows = Appointment.objects.filter(
+        scheduled_date__gte=start_date,
+        scheduled_date__lte=end_date,
+        status__in=BOOKED_STATUSES + (Appointment.Status.NO_SHOW,)
+    ).annotate(
+        iso_weekday=ExtractIsoWeekDay('scheduled_date')
+    ).values(
+        'resource_id', 'iso_weekday', 'scheduled_time', 'duration_minutes', 'status'
+    ).annotate(count=Count('id')).order_by()
+    
+    for row in rows:
+        weekday = row['iso_weekday'] - 1
+        metric = 'no_show' if row['status'] == Appointment.Status.NO_SHOW else 'booked'
+        start = to_minutes(row['scheduled_time'])
+        end = start + row['duration_minutes']
+        for hour, minutes in spread_by_hour(start, min(end, 24 * 60)):
+            hour_totals[(weekday, hour)][metric] += minutes * row['count']
+        for block, block_start, block_end in blocks_by_day.get((row['resource_id'], weekday), []):
+            block_totals[block.id][metric] += overlap(start, end, block_start, block_end) * row['count']
+    
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'unit': 'minutes',
+        'blocks': [
+            {
+                'id': block.id,
+                'resource': block.resource.name if block.resource else None,
+                'day_of_week': block.day_of_week,
+                'day_display': block.get_day_of_week_display(),
+                'start_time': block.start_time.strftime('%H:%M'),
+                'end_time': block.end_time.strftime('%H:%M'),
+                **summarize(block_totals[block.id]),
+            }
+            for block in blocks
+        ],
+        'heatmap': [
+            {'day_of_week': day, 'hour': hour, **summarize(totals)}
+            for (day, hour), totals in sorted(hour_totals.items())
+            if any(totals.values())
+        ],
+    }
+
+
+def summarize(totals):
+    data = {metric: totals[metric] for metric in METRICS}
+    available = data['capacity'] - data['blocked']
+    used = data['booked'] + data['no_show']
+    data['free'] = max(0, available - used)
+    data['utilization'] = round(used / available * 100, 1) if available > 0 else None
+    return data
+
+
+class UtilizationView(APIView):
+    """
+    GET /api/v1/dashboard/utilization/?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
+    
+    Capacity utilization per weekly availability block and per
+    hour-of-week, in minutes. Defaults to the last 28 days; results are
+    cached per range.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        today = clinic_today()
+        try:
+            end_date = date.fromisoformat(request.query_params.get('end_date') or today.isoformat())
+            start_date = date.fromisoformat(
+                request.query_params.get('start_date') or (end_date - timedelta(days=27)).isoformat()
+            )
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': {'code': 'INVALID_RANGE', 'message': 'Dates must be YYYY-MM-DD.'}
+            }, status=400)
+        
+        if start_date > end_date or (end_date - start_date).days >= UTILIZATION_MAX_DAYS:
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_RANGE',
+                    'message': f'start_date must not be after end_date and the range '
+                               f'must not exceed {UTILIZATION_MAX_DAYS} days.'
+                }
+            }, status=400)
+        
+        cache_key = f'analytics:utilization:{start_date.isoformat()}:{end_date.isoformat()}'
+        data = cache.get(cache_key)
+        if data is None:
+            data = build_utilization(start_date, end_date)
+            cache.set(cache_key, data, getattr(settings, 'ANALYTICS_UTILIZATION_CACHE_SECONDS', 900))
+        
+        return Response({
+            'success': True,
+            'data': data
+        })
+
+
+def weekly_capacity_slots():
+    """Bookable slots per week in each (day_of_week, hour) cell, across resources."""
+    slot_minutes = getattr(settings, 'BOOKING_SLOT_DURATION_MINUTES', 30)
+    minutes = Counter()
+    for block in WeeklyAvailability.objects.filter(is_active=True):
+        for hour, block_minutes in spread_by_hour(to_minutes(block.start_time), to_minutes(block.end_time)):
+            minutes[(block.day_of_week, hour)] += block_minutes
+    return {cell: total / slot_minutes for cell, total in minutes.items()}
+
+
+class DemandForecastView(APIView):
+    """
+    GET /api/v1/dashboard/forecast/
+    
+    Latest nightly demand forecast per hour-of-week, next to the weekly
+    slot capacity scheduled for that hour. Cells whose projected
+    utilization approaches 100% are candidates for extra availability.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        capacity = weekly_capacity_slots()
+        forecasts = list(DemandForecast.objects.all())
+        
+        cells = []
+        for forecast in forecasts:
+            slots = capacity.get((forecast.day_of_week, forecast.hour), 0)
+            cells.append({
+                'day_of_week': forecast.day_of_week,
+                'day_display': forecast.get_day_of_week_display(),
+                'hour': forecast.hour,
+                'expected_bookings': forecast.expected_bookings,
+                'no_show_probability': forecast.no_show_probability,
+                'avg_lead_days': forecast.avg_lead_days,
+                'observed_bookings': forecast.observed_bookings,
+                'observed_outcomes': forecast.observed_outcomes,
+                'capacity_slots': slots,
+                'projected_utilization': (
+                    round(forecast.expected_bookings / slots * 100, 1) if slots else None
+                ),
+            })
+        
+        return Response({
+            'success': True,
+            'data': {
+                'generated_at': max((f.updated_at for f in forecasts), default=None),
+                'forecast': cells,
+            }
+        })
+
+
+class OverbookingMetricsView(APIView):
+    """
+    GET /api/v1/dashboard/overbooking/?days=14
+    
+    Overbooking policy in force, the hours-of-week it currently applies to,
+    and how many bookings were overbooked per day.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        try:
+            days = min(max(int(request.query_params.get('days', 14)), 1), 90)
+        except ValueError:
+            days = 14
+        
+        hours = overbookable_hours()
+        daily = overbooking_counts(days)
+        
+        return Response({
+            'success': True,
+            'data': {
+                'policy': {
+                    'enabled': overbooking_enabled(),
+                    'no_show_threshold': getattr(settings, 'OVERBOOKING_NO_SHOW_THRESHOLD', 0.25),
+                    'max_per_slot': max_per_slot(),
+                    'min_observations': getattr(settings, 'OVERBOOKING_MIN_OBSERVATIONS', 20),
+                },
+                'hours': [
+                    {'day_of_week': day_of_week, 'hour': hour, 'no_show_probability': probability}
+                    for (day_of_week, hour), probability in sorted(hours.items())
+                ],
+                'daily': daily,
+                'total_overbooked': sum(day['overbooked'] for day in daily),
+            }
+        })
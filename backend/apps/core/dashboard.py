@@ -6,18 +6,231 @@ Provides real-time statistics and activity feeds.
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from django.db.models import Count, Q
-from django.db.models.functions import TruncDate
+from django.db import transaction
+from django.db.models import Count, Q, F, Value
+from django.db.models.functions import TruncDate, Concat
 from django.utils import timezone
 from datetime import timedelta
 import logging
 
-from apps.appointments.models import Appointment
+from apps.appointments.models import Appointment, Patient
 from apps.core.models import ActivityLog
+from apps.core.pagination import ActivityLogKeysetPagination, AppointmentKeysetPagination
+from apps.appointments.signals import appointment_status_transition, build_status_change
 
 logger = logging.getLogger(__name__)
 
 
+def get_time_ago(dt):
+    """Convert datetime to human-readable time ago string."""
+    now = timezone.now()
+    diff = now - dt
+    
+    if diff.days > 0:
+        if diff.days == 1:
+            return '1 day ago'
+        return f'{diff.days} days ago'
+    
+    hours = diff.seconds // 3600
+    if hours > 0:
+        if hours == 1:
+            return '1 hour ago'
+        return f'{hours} hours ago'
+    
+    minutes = diff.seconds // 60
+    if minutes > 0:
+        if minutes == 1:
+            return '1 minute ago'
+        return f'{minutes} minutes ago'
+    
+    return 'Just now'
+
+
+def serialize_pending_appointment(apt):
+    """
+    Row shape for the pending approvals list (also pushed on the stream).
+    Select `patient` with the appointment to keep the reliability fields free.
+    """
+    patient = apt.patient
+    return {
+        'id': apt.id,
+        'reference_id': apt.reference_id,
+        'patient_name': apt.patient_name,
+        'patient_email': apt.patient_email,
+        'patient_phone': apt.patient_phone,
+        'service': apt.service.title if apt.service else 'General Consultation',
+        'service_id': apt.service.id if apt.service else None,
+        'scheduled_date': apt.scheduled_date.isoformat(),
+        'scheduled_time': apt.scheduled_time.strftime('%H:%M'),
+        'modality': apt.modality,
+        'modality_display': apt.get_modality_display(),
+        'patient_type': apt.patient_type,
+        'patient_type_display': apt.get_patient_type_display(),
+        'reason': apt.reason,
+        'created_at': apt.created_at.isoformat(),
+        'patient_hash': patient.email_hash if patient else None,
+        'patient_visits': patient.total_appointments if patient else 0,
+        'patient_reliability': patient.reliability_score if patient else None,
+    }
+
+
+def serialize_activity(activity):
+    """Row shape for the activity feed (also pushed on the stream)."""
+    return {
+        'id': activity.id,
+        'action_type': activity.action_type,
+        'action_display': activity.get_action_type_display(),
+        'description': activity.description,
+        'actor_name': activity.actor.full_name if activity.actor else 'System',
+        'actor_id': activity.actor.id if activity.actor else None,
+        'metadata': activity.metadata,
+        'created_at': activity.created_at.isoformat(),
+        'time_ago': get_time_ago(activity.created_at),
+    }
+
+
+def get_appointment_counts(today):
+    """
+    Every scalar appointment counter the dashboard needs, in one query.
+    Keys: one per status value, plus total, today, upcoming, this_week, last_week.
+    """
+    week_ago = today - timedelta(days=7)
+    last_week_start = week_ago - timedelta(days=7)
+    
+    aggregates = {
+        'total': Count('id'),
+        'today': Count('id', filter=Q(
+            scheduled_date=today,
+            status__in=[Appointment.Status.PENDING, Appointment.Status.APPROVED]
+        )),
+        # Upcoming appointments (next 7 days)
+        'upcoming': Count('id', filter=Q(
+            status=Appointment.Status.APPROVED,
+            scheduled_date__gte=today,
+            scheduled_date__lte=today + timedelta(days=7)
+        )),
+        'this_week': Count('id', filter=Q(created_at__date__gte=week_ago)),
+        'last_week': Count('id', filter=Q(
+            created_at__date__gte=last_week_start,
+            created_at__date__lt=week_ago
+        )),
+    }
+    for status_value in Appointment.Status.values:
+        aggregates[status_value] = Count('id', filter=Q(status=status_value))
+    
+    return Appointment.objects.aggregate(**aggregates)
+
+
+def count_unique_patients():
+    """Distinct patients with at least one appointment."""
+    return Patient.objects.filter(appointments__isnull=False).distinct().count()
+
+
+def build_summary_data(today, counts):
+    """Payload for the summary section."""
+    month_ago = today - timedelta(days=30)
+    
+    # Completion rate calculation
+    total_non_pending = counts['total'] - counts[Appointment.Status.PENDING]
+    completion_rate = 0
+    if total_non_pending > 0:
+        completion_rate = round((counts[Appointment.Status.COMPLETED] / total_non_pending) * 100, 1)
+    
+    # Weekly comparison for trends
+    this_week_count = counts['this_week']
+    last_week_count = counts['last_week']
+    if last_week_count > 0:
+        weekly_change = round(((this_week_count - last_week_count) / last_week_count) * 100, 1)
+    else:
+        weekly_change = 100 if this_week_count > 0 else 0
+    
+    # Monthly appointments chart data
+    monthly_data = Appointment.objects.filter(
+        created_at__date__gte=month_ago
+    ).annotate(
+        date=TruncDate('created_at')
+    ).values('date').annotate(
+        count=Count('id')
+    ).order_by('date')
+    
+    return {
+        'stats': {
+            'pending_appointments': counts[Appointment.Status.PENDING],
+            'today_appointments': counts['today'],
+            'total_patients': count_unique_patients(),
+            'completion_rate': completion_rate,
+            'upcoming_appointments': counts['upcoming'],
+            'weekly_change': weekly_change,
+        },
+        'status_breakdown': {
+            status_value: counts[status_value]
+            for status_value in Appointment.Status.values
+        },
+        'chart_data': list(monthly_data),
+    }
+
+
+def build_pending_data(total_pending=None):
+    """Payload for the pending section; pass total_pending if already counted."""
+    pending = Appointment.objects.filter(
+        status=Appointment.Status.PENDING
+    ).select_related('service', 'patient').order_by('-created_at')[:20]
+    
+    appointments_data = [serialize_pending_appointment(apt) for apt in pending]
+    
+    if total_pending is None:
+        total_pending = Appointment.objects.filter(
+            status=Appointment.Status.PENDING
+        ).count()
+    
+    return {
+        'appointments': appointments_data,
+        'count': len(appointments_data),
+        'total_pending': total_pending,
+    }
+
+
+def build_activity_data(request, paginator):
+    """Payload for the activity section (first page unless a cursor is given)."""
+    activities = paginator.paginate_queryset(
+        ActivityLog.objects.select_related('actor'), request
+    )
+    activity_data = [serialize_activity(activity) for activity in activities]
+    
+    return {
+        'activities': activity_data,
+        'count': len(activity_data),
+        'next': paginator.get_next_link(),
+    }
+
+
+def build_today_data(today):
+    """Payload for the today section."""
+    appointments = Appointment.objects.filter(
+        scheduled_date=today,
+        status__in=[Appointment.Status.APPROVED, Appointment.Status.PENDING]
+    ).select_related('service').order_by('scheduled_time')
+    
+    appointments_data = []
+    for apt in appointments:
+        appointments_data.append({
+            'id': apt.id,
+            'reference_id': apt.reference_id,
+            'patient_name': apt.patient_name,
+            'service': apt.service.title if apt.service else 'General Consultation',
+            'scheduled_time': apt.scheduled_time.strftime('%H:%M'),
+            'modality': apt.modality,
+            'status': apt.status,
+            'status_display': apt.get_status_display(),
+        })
+    
+    return {
+        'appointments': appointments_data,
+        'count': len(appointments_data),
+        'date': today.isoformat()
+    }
+
+
 class DashboardSummaryView(APIView):
     """
     GET /api/v1/dashboard/summary/
@@ -33,106 +246,10 @@ class DashboardSummaryView(APIView):
     
     def get(self, request):
         today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-        
-        # Core stats - real SQL aggregation
-        pending_count = Appointment.objects.filter(
-            status=Appointment.Status.PENDING
-        ).count()
-        
-        today_count = Appointment.objects.filter(
-            scheduled_date=today,
-            status__in=[Appointment.Status.PENDING, Appointment.Status.APPROVED]
-        ).count()
-        
-        # Total unique patients (by email)
-        total_patients = Appointment.objects.values(
-            'patient_details__email'
-        ).distinct().count()
-        
-        # More accurate patient count using raw query for JSON field
-        all_appointments = Appointment.objects.all()
-        unique_emails = set()
-        for apt in all_appointments:
-            email = apt.patient_details.get('email', '')
-            if email:
-                unique_emails.add(email.lower())
-        total_patients = len(unique_emails)
-        
-        # Completion rate calculation
-        completed_count = Appointment.objects.filter(
-            status=Appointment.Status.COMPLETED
-        ).count()
-        
-        total_non_pending = Appointment.objects.exclude(
-            status=Appointment.Status.PENDING
-        ).count()
-        
-        completion_rate = 0
-        if total_non_pending > 0:
-            completion_rate = round((completed_count / total_non_pending) * 100, 1)
-        
-        # Weekly comparison for trends
-        this_week_count = Appointment.objects.filter(
-            created_at__date__gte=week_ago
-        ).count()
-        
-        last_week_start = week_ago - timedelta(days=7)
-        last_week_count = Appointment.objects.filter(
-            created_at__date__gte=last_week_start,
-            created_at__date__lt=week_ago
-        ).count()
-        
-        # Calculate percentage change
-        if last_week_count > 0:
-            weekly_change = round(((this_week_count - last_week_count) / last_week_count) * 100, 1)
-        else:
-            weekly_change = 100 if this_week_count > 0 else 0
-        
-        # Appointments by status breakdown
-        status_breakdown = Appointment.objects.values('status').annotate(
-            count=Count('id')
-        )
-        status_dict = {item['status']: item['count'] for item in status_breakdown}
-        
-        # Upcoming appointments (next 7 days)
-        upcoming_count = Appointment.objects.filter(
-            status=Appointment.Status.APPROVED,
-            scheduled_date__gte=today,
-            scheduled_date__lte=today + timedelta(days=7)
-        ).count()
-        
-        # Monthly appointments chart data
-        monthly_data = Appointment.objects.filter(
-            created_at__date__gte=month_ago
-        ).annotate(
-            date=TruncDate('created_at')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
         
         return Response({
             'success': True,
-            'data': {
-                'stats': {
-                    'pending_appointments': pending_count,
-                    'today_appointments': today_count,
-                    'total_patients': total_patients,
-                    'completion_rate': completion_rate,
-                    'upcoming_appointments': upcoming_count,
-                    'weekly_change': weekly_change,
-                },
-                'status_breakdown': {
-                    'pending': status_dict.get('pending', 0),
-                    'approved': status_dict.get('approved', 0),
-                    'completed': status_dict.get('completed', 0),
-                    'cancelled': status_dict.get('cancelled', 0),
-                    'rejected': status_dict.get('rejected', 0),
-                    'no_show': status_dict.get('no_show', 0),
-                },
-                'chart_data': list(monthly_data),
-            }
+            'data': build_summary_data(today, get_appointment_counts(today))
         })
 
 
@@ -145,39 +262,9 @@ class PendingAppointmentsView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
     
     def get(self, request):
-        pending = Appointment.objects.filter(
-            status=Appointment.Status.PENDING
-        ).select_related('service').order_by('-created_at')[:20]
-        
-        appointments_data = []
-        for apt in pending:
-            appointments_data.append({
-                'id': apt.id,
-                'reference_id': apt.reference_id,
-                'patient_name': apt.patient_name,
-                'patient_email': apt.patient_email,
-                'patient_phone': apt.patient_phone,
-                'service': apt.service.title if apt.service else 'General Consultation',
-                'service_id': apt.service.id if apt.service else None,
-                'scheduled_date': apt.scheduled_date.isoformat(),
-                'scheduled_time': apt.scheduled_time.strftime('%H:%M'),
-                'modality': apt.modality,
-                'modality_display': apt.get_modality_display(),
-                'patient_type': apt.patient_type,
-                'patient_type_display': apt.get_patient_type_display(),
-                'reason': apt.reason,
-                'created_at': apt.created_at.isoformat(),
-            })
-        
         return Response({
             'success': True,
-            'data': {
-                'appointments': appointments_data,
-                'count': len(appointments_data),
-                'total_pending': Appointment.objects.filter(
-                    status=Appointment.Status.PENDING
-                ).count()
-            }
+            'data': build_pending_data()
         })
 
 
@@ -186,61 +273,129 @@ class RecentActivityView(APIView):
     GET /api/v1/dashboard/activity/
     
     Returns recent activity feed for dashboard.
+    Older entries are reached by following the `next` cursor.
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = ActivityLogKeysetPagination
     
     def get(self, request):
-        limit = int(request.query_params.get('limit', 10))
-        
-        activities = ActivityLog.objects.select_related('actor').order_by(
-            '-created_at'
-        )[:limit]
-        
-        activity_data = []
-        for activity in activities:
-            activity_data.append({
-                'id': activity.id,
-                'action_type': activity.action_type,
-                'action_display': activity.get_action_type_display(),
-                'description': activity.description,
-                'actor_name': activity.actor.full_name if activity.actor else 'System',
-                'actor_id': activity.actor.id if activity.actor else None,
-                'metadata': activity.metadata,
-                'created_at': activity.created_at.isoformat(),
-                'time_ago': self._get_time_ago(activity.created_at),
-            })
+        paginator = self.pagination_class()
         
-        return Response({
+        response = Response({
             'success': True,
-            'data': {
-                'activities': activity_data,
-                'count': len(activity_data)
-            }
+            'data': build_activity_data(request, paginator)
         })
+        return paginator.add_count_header(response)
+
+
+class DashboardBootstrapView(APIView):
+    """
+    GET /api/v1/dashboard/bootstrap/?sections=summary,pending,activity,today
     
-    def _get_time_ago(self, dt):
-        """Convert datetime to human-readable time ago string."""
-        now = timezone.now()
-        diff = now - dt
+    Returns several dashboard sections in one authenticated call.
+    Sections share queries: the counters are aggregated once and reused
+    by both summary and pending. Omitting `sections` returns all four.
+    Each section has the same shape as its standalone endpoint.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    SECTIONS = ('summary', 'pending', 'activity', 'today')
+    
+    def get(self, request):
+        requested = request.query_params.get('sections')
+        if requested:
+            sections = [name.strip() for name in requested.split(',') if name.strip()]
+        else:
+            sections = list(self.SECTIONS)
+        
+        unknown = [name for name in sections if name not in self.SECTIONS]
+        if unknown or not sections:
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_SECTIONS',
+                    'message': f"Unknown sections: {', '.join(unknown)}. "
+                               f"Choose from: {', '.join(self.SECTIONS)}."
+                }
+            }, status=400)
+        
+        today = timezone.now().date()
+        data = {}
+        
+        counts = None
+        if 'summary' in sections:
+            counts = get_appointment_counts(today)
+            data['summary'] = build_summary_data(today, counts)
         
-        if diff.days > 0:
-            if diff.days == 1:
-                return '1 day ago'
-            return f'{diff.days} days ago'
+        if 'pending' in sections:
+            data['pending'] = build_pending_data(
+                counts[Appointment.Status.PENDING] if counts else None
+            )
+        
+        if 'activity' in sections:
+            data['activity'] = build_activity_data(request, ActivityLogKeysetPagination())
         
-        hours = diff.seconds // 3600
-        if hours > 0:
-            if hours == 1:
-                return '1 hour ago'
-            return f'{hours} hours ago'
+        if 'today' in sections:
+            data['today'] = build_today_data(today)
         
-        minutes = diff.seconds // 60
-        if minutes > 0:
-            if minutes == 1:
-                return '1 minute ago'
-            return f'{minutes} minutes ago'
+        return Response({
+            'success': True,
+            'data': data
+        })
+
+
+class PatientHistoryView(APIView):
+    """
+    GET /api/v1/dashboard/patients/{email_hash}/
+    
+    Returns a patient's cached aggregates (visits, last visit, no-show and
+    cancel rates, preferred modality) and their appointment history.
+    History pages follow the `next` cursor.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request, email_hash):
+        try:
+            patient = Patient.objects.get(email_hash=email_hash.lower())
+        except Patient.DoesNotExist:
+            return Response({
+                'success': False,
+                'error': {'message': 'Patient not found'}
+            }, status=404)
+        
+        paginator = AppointmentKeysetPagination()
+        appointments = paginator.paginate_queryset(
+            patient.appointments.select_related('service'), request
+        )
+        
+        history = []
+        for apt in appointments:
+            history.append({
+                'id': apt.id,
+                'reference_id': apt.reference_id,
+                'status': apt.status,
+                'status_display': apt.get_status_display(),
+                'service': apt.service.title if apt.service else 'General Consultation',
+                'scheduled_date': apt.scheduled_date.isoformat(),
+                'scheduled_time': apt.scheduled_time.strftime('%H:%M'),
+                'duration_minutes': apt.duration_minutes,
+                'modality': apt.modality,
+            })
         
-        return 'Just now'
+        return Response({
+            'success': True,
+            'data': {
+                'patient': {
+                    'email_hash': patient.email_hash,
+                    'name': patient.name,
+                    'email': patient.email,
+                    'phone': patient.phone,
+                    'stats': patient.get_stats(),
+                },
+                'appointments': history,
+                'next': paginator.get_next_link(),
+            }
+        })
 
 
 class ApproveAppointmentView(APIView):
@@ -374,40 +529,154 @@ class RejectAppointmentView(APIView):
         })
 
 
-class TodayAppointmentsView(APIView):
+class BulkAppointmentActionView(APIView):
     """
-    GET /api/v1/dashboard/today/
+    POST /api/v1/dashboard/appointments/bulk/
     
-    Returns today's scheduled appointments.
+    Apply one action to many appointments in a single round trip.
+    Body: {"ids": [1, 2, 3], "action": "approve", "reason": "", "meeting_link": ""}
+    
+    Statuses are updated with one UPDATE, activity is written with
+    bulk_create, and notifications are queued as one Celery job.
+    Appointments not in an allowed source status are skipped.
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
     
-    def get(self, request):
-        today = timezone.now().date()
-        
-        appointments = Appointment.objects.filter(
-            scheduled_date=today,
-            status__in=[Appointment.Status.APPROVED, Appointment.Status.PENDING]
-        ).select_related('service').order_by('scheduled_time')
+    ACTIONS = {
+        'approve': {
+            'from': [Appointment.Status.PENDING],
+            'to': Appointment.Status.APPROVED,
+            'log_type': ActivityLog.ActionType.APPOINTMENT_APPROVED,
+            'description': 'Appointment confirmed for {name}',
+            'note_prefix': None,
+        },
+        'reject': {
+            'from': [Appointment.Status.PENDING],
+            'to': Appointment.Status.REJECTED,
+            'log_type': ActivityLog.ActionType.APPOINTMENT_REJECTED,
+            'description': 'Appointment rejected for {name}',
+            'note_prefix': 'Rejected',
+        },
+        'cancel': {
+            'from': [Appointment.Status.PENDING, Appointment.Status.APPROVED],
+            'to': Appointment.Status.CANCELLED,
+            'log_type': ActivityLog.ActionType.APPOINTMENT_CANCELLED,
+            'description': 'Appointment cancelled for {name}',
+            'note_prefix': 'Cancelled',
+        },
+        'complete': {
+            'from': [Appointment.Status.APPROVED],
+            'to': Appointment.Status.COMPLETED,
+            'log_type': ActivityLog.ActionType.APPOINTMENT_COMPLETED,
+            'description': 'Appointment completed for {name}',
+            'note_prefix': None,
+        },
+    }
+    
+    def post(self, request):
+        from apps.appointments.serializers import BulkAppointmentActionSerializer
+        from apps.appointments.tasks import send_bulk_appointment_notifications
+        
+        serializer = BulkAppointmentActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        action_type = serializer.validated_data['action']
+        requested_ids = set(serializer.validated_data['ids'])
+        reason = serializer.validated_data.get('reason', '')
+        meeting_link = serializer.validated_data.get('meeting_link', '')
+        config = self.ACTIONS[action_type]
+        
+        updates = {'status': config['to'], 'updated_at': timezone.now()}
+        if action_type == 'approve' and meeting_link:
+            updates['meeting_link'] = meeting_link
+        if config['note_prefix'] and reason:
+            updates['notes'] = Concat(
+                Value(f"{config['note_prefix']}: {reason}\n"), F('notes')
+            )
         
-        appointments_data = []
-        for apt in appointments:
-            appointments_data.append({
-                'id': apt.id,
-                'reference_id': apt.reference_id,
-                'patient_name': apt.patient_name,
-                'service': apt.service.title if apt.service else 'General Consultation',
-                'scheduled_time': apt.scheduled_time.strftime('%H:%M'),
-                'modality': apt.modality,
-                'status': apt.status,
-                'status_display': apt.get_status_display(),
-            })
+        actor = request.user if request.user.is_authenticated else None
+        
+        with transaction.atomic():
+            rows = list(
+                Appointment.objects.select_for_update().filter(
+                    id__in=requested_ids,
+                    status__in=config['from']
+                ).values(
+                    'id', 'reference_id', 'status', 'patient_id',
+                    'patient_details', 'scheduled_date'
+                )
+            )
+            updated_ids = [row['id'] for row in rows]
+            
+            if updated_ids:
+                Appointment.objects.filter(id__in=updated_ids).update(**updates)
+                
+                logs = []
+                for row in rows:
+                    details = row['patient_details'] or {}
+                    entry = ActivityLog.build(
+                        action_type=config['log_type'],
+                        description=config['description'].format(
+                            name=details.get('name', 'Unknown')
+                        ),
+                        actor=actor,
+                        metadata={
+                            'reference_id': row['reference_id'],
+                            'patient_email': details.get('email', ''),
+                            'scheduled_date': row['scheduled_date'].isoformat(),
+                            'reason': reason,
+                            'bulk': True,
+                        },
+                    )
+                    entry.related_object_type = Appointment.__name__
+                    entry.related_object_id = row['id']
+                    logs.append(entry)
+                ActivityLog.save_entries(logs)
+                
+                appointment_status_transition.send(sender=Appointment, changes=[
+                    build_status_change(
+                        row['id'], row['reference_id'], row['patient_id'],
+                        row['status'], config['to'], row['scheduled_date']
+                    )
+                    for row in rows
+                ])
+        
+        # Trigger emails (async via Celery) as one grouped job
+        if updated_ids and action_type in ('approve', 'reject'):
+            try:
+                send_bulk_appointment_notifications.delay(updated_ids, action_type, reason)
+            except Exception as e:
+                # Log but don't fail if Celery is not running
+                logger.error(
+                    f"Failed to queue bulk {action_type} emails for appointments {updated_ids}: {e}. "
+                    f"Admin should manually notify the affected patients."
+                )
+        
+        skipped_ids = sorted(requested_ids - set(updated_ids))
         
         return Response({
             'success': True,
+            'message': f'{len(updated_ids)} appointment(s) updated',
             'data': {
-                'appointments': appointments_data,
-                'count': len(appointments_data),
-                'date': today.isoformat()
+                'action': action_type,
+                'status': config['to'],
+                'updated_ids': updated_ids,
+                'skipped_ids': skipped_ids,
+                'updated_count': len(updated_ids),
             }
         })
+
+
+class TodayAppointmentsView(APIView):
+    """
+    GET /api/v1/dashboard/today/
+    
+    Returns today's scheduled appointments.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        return Response({
+            'success': True,
+            'data': build_today_data(timezone.now().date())
+        })
@@ -0,0 +1,137 @@
+"""
+Management command to backfill Patient rows from Appointment.patient_details.
+Processes appointments in primary-key batches so it is safe on large tables,
+runs a dedup/merge pass over patients whose emails normalize equally, and
+rebuilds the per-patient aggregate cache.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import Lower, Trim
+
+from apps.appointments.models import Appointment, Patient
+from apps.core.utils import hash_email
+
+
+class Command(BaseCommand):
+    help = 'Link appointments to Patient records (batched), merge duplicates and rebuild patient stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Appointments processed per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--skip-merge',
+            action='store_true',
+            help='Only backfill, do not run the dedup/merge pass',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        linked = self.backfill(batch_size)
+        self.stdout.write(self.style.SUCCESS(f'✓ Linked {linked} appointments to patients'))
+
+        if not options['skip_merge']:
+            merged = self.merge_duplicates()
+            self.stdout.write(self.style.SUCCESS(f'✓ Merged {merged} duplicate patients'))
+
+        refreshed = Patient.recompute_stats()
+        self.stdout.write(self.style.SUCCESS(f'✓ Recomputed stats for {refreshed} patients'))
+
+    def backfill(self, batch_size):
+        linked = 0
+        last_id = 0
+
+        while True:
+            rows = list(
+                Appointment.objects.filter(
+                    id__gt=last_id,
+                    patient__isnull=True
+                ).order_by('id').values('id', 'patient_details')[:batch_size]
+            )
+            if not rows:
+                return linked
+            last_id = rows[-1]['id']
+
+            with transaction.atomic():
+                linked += self._link_batch(rows)
+
+            self.stdout.write(f'  … processed up to appointment #{last_id}')
+
+    def _link_batch(self, rows):
+        # Latest details per email within the batch win
+        details_by_email = {}
+        for row in rows:
+            details = row['patient_details'] or {}
+            email = Patient.normalize_email(details.get('email'))
+            if email:
+                details_by_email[email] = details
+
+        if not details_by_email:
+            return 0
+
+        Patient.objects.bulk_create(
+            [
+                Patient(
+                    email=email,
+                    email_hash=hash_email(email),
+                    name=(details.get('name') or '')[:100],
+                    phone=(details.get('phone') or '')[:20],
+                )
+                for email, details in details_by_email.items()
+            ],
+            ignore_conflicts=True,
+        )
+        patient_ids = dict(
+            Patient.objects.filter(
+                email__in=details_by_email.keys()
+            ).values_list('email', 'id')
+        )
+
+        updates = []
+        for row in rows:
+            details = row['patient_details'] or {}
+            patient_id = patient_ids.get(Patient.normalize_email(details.get('email')))
+            if patient_id:
+                updates.append(Appointment(id=row['id'], patient_id=patient_id))
+
+        Appointment.objects.bulk_update(updates, ['patient'])
+        return len(updates)
+
+    def merge_duplicates(self):
+        """
+        Merge patients whose stored emails differ only by case/whitespace
+        (e.g. rows created before normalization). The oldest record is kept.
+        """
+        duplicates = Patient.objects.annotate(
+            normalized=Lower(Trim('email'))
+        ).values('normalized').annotate(
+            keep_id=Min('id'),
+            total=Count('id')
+        ).filter(total__gt=1)
+
+        merged = 0
+        for group in duplicates:
+            with transaction.atomic():
+                others = Patient.objects.annotate(
+                    normalized=Lower(Trim('email'))
+                ).filter(
+                    normalized=group['normalized']
+                ).exclude(id=group['keep_id'])
+                other_ids = list(others.values_list('id', flat=True))
+
+                Appointment.objects.filter(patient_id__in=other_ids).update(
+                    patient_id=group['keep_id']
+                )
+                merged += Patient.objects.filter(id__in=other_ids).delete()[0]
+                Patient.objects.filter(id=group['keep_id']).update(
+                    email=group['normalized'],
+                    email_hash=hash_email(group['normalized'])
+                )
+
+        return merged
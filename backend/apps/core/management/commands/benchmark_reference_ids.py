@@ -0,0 +1,92 @@
+"""
+Management command to benchmark reference-ID collision behavior.
+For each table size it reports the analytic per-insert collision
+probability, expected INSERT attempts and the chance of exhausting the
+retry budget, then checks the estimate with an in-memory simulation.
+No database rows are written.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core.models import ReferenceIdModel
+from apps.core.utils import generate_reference_id, reference_id_space
+
+
+class Command(BaseCommand):
+    help = 'Benchmark reference-ID collision rates at increasing table sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000, 1_000_000, 10_000_000],
+            help='Existing row counts to evaluate (default: 10k 100k 1M 10M)',
+        )
+        parser.add_argument(
+            '--length',
+            type=int,
+            nargs='+',
+            default=None,
+            help='ID lengths to evaluate (default: appointment and event registration lengths)',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=100_000,
+            help='New IDs drawn per simulation (default: 100000)',
+        )
+        parser.add_argument(
+            '--simulate-max',
+            type=int,
+            default=1_000_000,
+            help='Largest table size to simulate in memory (default: 1000000)',
+        )
+
+    def handle(self, *args, **options):
+        lengths = options['length'] or [
+            settings.BOOKING_REFERENCE_ID_LENGTH,
+            getattr(settings, 'EVENT_CONFIRMATION_CODE_LENGTH', 10),
+        ]
+        attempts = ReferenceIdModel.reference_id_attempts
+
+        for length in lengths:
+            space = reference_id_space(length)
+            started = time.perf_counter()
+            for _ in range(10_000):
+                generate_reference_id(length)
+            per_id_us = (time.perf_counter() - started) / 10_000 * 1e6
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\nLength {length}: {space:,} possible IDs, {per_id_us:.1f}µs per ID'
+            ))
+            self.stdout.write(
+                f'  {"rows":>12}  {"p(collide)":>12}  {"attempts":>9}  '
+                f'{"p(exhaust)":>11}  {"simulated":>11}'
+            )
+
+            for rows in options['rows']:
+                p = min(rows / space, 1.0)
+                expected_attempts = 1 / (1 - p) if p < 1 else float('inf')
+                simulated = '-'
+                if rows <= options['simulate_max']:
+                    simulated = f'{self.simulate(length, rows, options["samples"]):.2e}'
+
+                line = (
+                    f'  {rows:>12,}  {p:>12.2e}  {expected_attempts:>9.4f}  '
+                    f'{p ** attempts:>11.2e}  {simulated:>11}'
+                )
+                self.stdout.write(self.style.WARNING(line) if p ** attempts > 1e-9 else line)
+
+        self.stdout.write(
+            f'\nRetry budget is {attempts} attempts; rows in yellow risk '
+            f'exhausting it often enough to warrant a longer ID.'
+        )
+
+    def simulate(self, length, rows, samples):
+        existing = {generate_reference_id(length) for _ in range(rows)}
+        hits = sum(1 for _ in range(samples) if generate_reference_id(length) in existing)
+        return hits / samples
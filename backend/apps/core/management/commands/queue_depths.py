@@ -0,0 +1,57 @@
+"""
+Management command to print Celery queue depths.
+Reads the message count of every configured queue from the broker, next
+to the queue's rate limit; --watch repeats every N seconds. A drained
+queue has no key on Redis, so a queue the broker does not know is 0.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from kombu.exceptions import ChannelError
+
+from config.celery import app
+
+
+class Command(BaseCommand):
+    help = 'Print pending message counts for each Celery queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            type=int,
+            default=0,
+            help='Refresh every N seconds until interrupted (default: print once)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self.print_depths()
+                if not options['watch']:
+                    return
+                time.sleep(options['watch'])
+        except KeyboardInterrupt:
+            pass
+
+    def print_depths(self):
+        queues = getattr(settings, 'TASK_QUEUES', {})
+        try:
+            with app.connection_for_read() as connection:
+                channel = connection.default_channel
+                depths = {name: self.queue_depth(channel, name) for name in queues}
+        except Exception as e:
+            raise CommandError(f'Could not read queue depths from the broker: {e}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(time.strftime('\n%H:%M:%S')))
+        self.stdout.write(f'  {"queue":<15}  {"pending":>8}  {"rate limit":>10}')
+        for name, queue in queues.items():
+            line = f'  {name:<15}  {depths[name]:>8}  {queue["rate_limit"] or "-":>10}'
+            self.stdout.write(self.style.WARNING(line) if depths[name] else line)
+
+    def queue_depth(self, channel, name):
+        try:
+            return channel.queue_declare(queue=name, passive=True).message_count
+        except ChannelError:
+            return 0
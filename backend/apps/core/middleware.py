@@ -8,6 +8,8 @@ from django.core.cache import cache
 from django.http import JsonResponse
 from django.conf import settings
 
+from .activity import start_buffer, flush_buffer
+
 
 class RateLimitMiddleware:
     """
@@ -90,3 +92,26 @@ class RateLimitMiddleware:
         
         cache.set(cache_key, request_count + 1, window)
         return True
+
+
+class ActivityLogBufferMiddleware:
+    """
+    Buffers ActivityLog entries written during a request and flushes them
+    with one bulk_create after the view (and its transaction) has finished.
+    Entries from rolled-back transactions never reach the buffer, and
+    entries from requests that end in a server error are discarded.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        token = start_buffer()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            flush_buffer(token, discard=True)
+            raise
+        
+        flush_buffer(token, discard=response.status_code >= 500)
+        return response
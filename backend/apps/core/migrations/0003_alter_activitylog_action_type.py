@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='action_type',
+            field=models.CharField(choices=[('appointment_created', 'Appointment Created'), ('appointment_approved', 'Appointment Approved'), ('appointment_rejected', 'Appointment Rejected'), ('appointment_cancelled', 'Appointment Cancelled'), ('appointment_completed', 'Appointment Completed'), ('appointment_rescheduled', 'Appointment Rescheduled'), ('blog_published', 'Blog Post Published'), ('blog_updated', 'Blog Post Updated'), ('event_created', 'Event Created'), ('event_updated', 'Event Updated'), ('user_login', 'User Login'), ('user_logout', 'User Logout')], db_index=True, max_length=50),
+        ),
+    ]
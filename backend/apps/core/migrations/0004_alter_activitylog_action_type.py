@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_activitylog_action_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='action_type',
+            field=models.CharField(choices=[('appointment_created', 'Appointment Created'), ('appointment_approved', 'Appointment Approved'), ('appointment_rejected', 'Appointment Rejected'), ('appointment_cancelled', 'Appointment Cancelled'), ('appointment_completed', 'Appointment Completed'), ('appointment_rescheduled', 'Appointment Rescheduled'), ('appointment_no_show', 'Appointment No-Show'), ('blog_published', 'Blog Post Published'), ('blog_updated', 'Blog Post Updated'), ('event_created', 'Event Created'), ('event_updated', 'Event Updated'), ('user_login', 'User Login'), ('user_logout', 'User Logout')], db_index=True, max_length=50),
+        ),
+    ]
@@ -2,11 +2,17 @@
 Base models with common fields and functionality.
 """
 
-from django.db import models
+from django.db import models, transaction, connections, router, IntegrityError
+from django.db.models.constants import OnConflict
 from django.conf import settings
 from django.utils import timezone
+import logging
 import uuid
 
+from .utils import generate_reference_id
+
+logger = logging.getLogger(__name__)
+
 
 class TimeStampedModel(models.Model):
     """
@@ -67,6 +73,76 @@ class SEOModel(models.Model):
         return self.meta_description or getattr(self, 'excerpt', '')[:160]
 
 
+class ReferenceIdModel(models.Model):
+    """
+    Abstract base model that allocates a random public reference ID on insert.
+    
+    Uniqueness is enforced by the column's unique constraint rather than an
+    exists() check per attempt. On PostgreSQL the INSERT runs as
+    INSERT ... ON CONFLICT DO NOTHING, so a conflict leaves the surrounding
+    transaction usable and no savepoint (two extra round trips) is needed;
+    other backends wrap the INSERT in a savepoint. The column is only
+    re-queried after a conflict, to tell a reference collision (retried
+    with a fresh ID) from other constraint violations (re-raised).
+    """
+    reference_id_field = 'reference_id'
+    reference_id_attempts = 5
+    
+    class Meta:
+        abstract = True
+    
+    def get_reference_id_length(self):
+        """Length passed to generate_reference_id(); None uses the booking default."""
+        return None
+    
+    def save(self, *args, **kwargs):
+        field = self.reference_id_field
+        if getattr(self, field):
+            return super().save(*args, **kwargs)
+        
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        ignore_conflicts = connections[using].vendor == 'postgresql'
+        
+        length = self.get_reference_id_length()
+        for attempt in range(1, self.reference_id_attempts + 1):
+            value = generate_reference_id(length)
+            setattr(self, field, value)
+            self._allocating_reference_id = ignore_conflicts
+            try:
+                if ignore_conflicts:
+                    return super().save(*args, **kwargs)
+                with transaction.atomic(using=using):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                collided = type(self)._default_manager.filter(**{field: value}).exists()
+                if not collided:
+                    setattr(self, field, '')
+                    raise
+                logger.warning(
+                    f"{type(self).__name__}.{field} collision on attempt {attempt}: {value}"
+                )
+            finally:
+                self._allocating_reference_id = False
+        
+        setattr(self, field, '')
+        raise IntegrityError(
+            f"Could not allocate a unique {field} after {self.reference_id_attempts} attempts"
+        )
+    
+    def _do_insert(self, manager, using, fields, returning_fields, raw):
+        if not (getattr(self, '_allocating_reference_id', False) and returning_fields):
+            return super()._do_insert(manager, using, fields, returning_fields, raw)
+        
+        rows = manager._insert(
+            [self], fields=fields, returning_fields=returning_fields,
+            using=using, raw=raw, on_conflict=OnConflict.IGNORE
+        )
+        # No row comes back when the insert hit a unique constraint
+        if not rows or rows[0] is None:
+            raise IntegrityError(f"Insert into {self._meta.db_table} conflicted with a unique constraint")
+        return rows
+
+
 class ActivityLog(TimeStampedModel):
     """
     Activity log for tracking admin actions and system events.
@@ -79,6 +155,8 @@ class ActivityLog(TimeStampedModel):
         APPOINTMENT_REJECTED = 'appointment_rejected', 'Appointment Rejected'
         APPOINTMENT_CANCELLED = 'appointment_cancelled', 'Appointment Cancelled'
         APPOINTMENT_COMPLETED = 'appointment_completed', 'Appointment Completed'
+        APPOINTMENT_RESCHEDULED = 'appointment_rescheduled', 'Appointment Rescheduled'
+        APPOINTMENT_NO_SHOW = 'appointment_no_show', 'Appointment No-Show'
         BLOG_PUBLISHED = 'blog_published', 'Blog Post Published'
         BLOG_UPDATED = 'blog_updated', 'Blog Post Updated'
         EVENT_CREATED = 'event_created', 'Event Created'
@@ -117,9 +195,10 @@ class ActivityLog(TimeStampedModel):
         return f"{self.get_action_type_display()}: {self.description}"
     
     @classmethod
-    def log(cls, action_type, description, actor=None, metadata=None, related_object=None):
+    def build(cls, action_type, description, actor=None, metadata=None, related_object=None):
         """
-        Helper method to create an activity log entry.
+        Build an unsaved activity log entry.
+        Use with bulk_create() when logging many entries at once.
         """
         log_entry = cls(
             action_type=action_type,
@@ -132,5 +211,29 @@ class ActivityLog(TimeStampedModel):
             log_entry.related_object_type = related_object.__class__.__name__
             log_entry.related_object_id = related_object.pk
         
-        log_entry.save()
         return log_entry
+    
+    @classmethod
+    def log(cls, action_type, description, actor=None, metadata=None, related_object=None):
+        """
+        Helper method to create an activity log entry.
+        Inside a request or Celery task the entry is buffered and written
+        with the scope's bulk_create, so the returned entry may be unsaved.
+        """
+        from .activity import buffer_entry
+        
+        log_entry = cls.build(action_type, description, actor, metadata, related_object)
+        if not buffer_entry(log_entry):
+            cls.save_entries([log_entry])
+        return log_entry
+    
+    @classmethod
+    def save_entries(cls, entries):
+        """
+        Write entries with one bulk_create and push them to the dashboard stream.
+        """
+        from .realtime import publish_activity
+        
+        created = cls.objects.bulk_create(entries)
+        publish_activity(created)
+        return created
@@ -0,0 +1,205 @@
+"""
+Keyset (cursor) pagination for admin listings.
+
+PageNumberPagination runs a COUNT(*) plus an OFFSET scan on every page,
+so deep pages get slower as history grows. Keyset pagination seeks
+directly to the last row of the previous page using the ordering
+columns, which lets the database walk the matching composite index.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over a fixed, unique ordering.
+
+    `ordering` must end with a unique column (usually `id`) so that the
+    position of the last row is unambiguous. Fields prefixed with `-` are
+    descending. An approximate total can be requested with
+    `?with_count=true`; it is returned in the `X-Approximate-Count` header
+    and as `count`. `count` (null unless requested) and `previous` (always
+    null) keep the page-number response keys for existing clients.
+    """
+    ordering = ('-id',)
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    count_header = 'X-Approximate-Count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.approximate_count = None
+
+        if self._wants_count(request):
+            self.approximate_count = self.get_approximate_count(queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self._build_seek_filter(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        response = Response(OrderedDict([
+            ('count', self.approximate_count),
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+        self.add_count_header(response)
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {
+                    'type': 'integer',
+                    'nullable': True,
+                },
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'previous': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def add_count_header(self, response):
+        """Attach the approximate count header when it was requested."""
+        if self.approximate_count is not None:
+            response[self.count_header] = str(self.approximate_count)
+        return response
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self.page[-1])
+        url = remove_query_param(self.base_url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, instance):
+        """Encode the ordering values of `instance` as an opaque token."""
+        values = []
+        for field_name in self._field_names():
+            value = getattr(instance, field_name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """Decode the cursor query param into typed ordering values."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            field_names = self._field_names()
+            if not isinstance(values, list) or len(values) != len(field_names):
+                raise ValueError
+            return [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(field_names, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_approximate_count(self, queryset):
+        """
+        Estimate the number of rows matched by `queryset`.
+
+        On PostgreSQL the planner's row estimate is used, which avoids a
+        full COUNT(*) scan. Other backends fall back to an exact count.
+        """
+        queryset = queryset.order_by()
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return queryset.count()
+
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def _wants_count(self, request):
+        value = request.query_params.get(self.count_query_param, '')
+        return value.lower() in ('1', 'true', 'yes')
+
+    def _field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _build_seek_filter(self, position):
+        """
+        Build the lexicographic "after this row" predicate.
+
+        For ordering (a, b, c) this expands to
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+        with the comparison flipped for descending fields.
+        """
+        seek = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            seek |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return seek
+
+
+class AppointmentKeysetPagination(KeysetPagination):
+    """Matches the (scheduled_date, scheduled_time) composite index."""
+    ordering = ('-scheduled_date', '-scheduled_time', '-id')
+
+
+class ActivityLogKeysetPagination(KeysetPagination):
+    """Newest-first activity feed; `limit` kept for the dashboard widget."""
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'limit'
+
+
+class RegistrationKeysetPagination(KeysetPagination):
+    """Newest-first event registrations."""
+    ordering = ('-created_at', '-id')
+    page_size = 50
@@ -0,0 +1,208 @@
+"""
+Real-time dashboard push channel.
+
+Appointment and activity changes are published as small JSON deltas on a
+Redis pub/sub channel. DashboardStreamView relays them to admin browsers
+as Server-Sent Events, so the dashboard fetches aggregates once and then
+applies deltas instead of re-polling the summary endpoints.
+
+EventSource cannot send an Authorization header, so browsers first POST
+to DashboardStreamTicketView for a single-use ticket that expires within
+seconds and open the stream with `?ticket=`; the access token itself
+never appears in a URL or access log.
+
+The stream view is async and must be served through config.asgi.
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.views.decorators.cache import never_cache
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+STREAM_TICKET_KEY_PREFIX = 'dashboard:stream-ticket:'
+
+_redis_client = None
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def publish_dashboard_event(event_type, data):
+    """
+    Publish a dashboard delta once the current transaction commits.
+    Failures are logged and swallowed; the dashboard can always re-fetch.
+    """
+    if not getattr(settings, 'DASHBOARD_STREAM_ENABLED', True):
+        return
+
+    message = json.dumps({'type': event_type, 'data': data}, default=str)
+
+    def _publish():
+        try:
+            _get_redis().publish(settings.DASHBOARD_STREAM_CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"Failed to publish dashboard event {event_type}: {e}")
+
+    transaction.on_commit(_publish)
+
+
+def publish_appointment_created(appointment):
+    from .dashboard import serialize_pending_appointment
+    publish_dashboard_event('appointment.created', {
+        'status': appointment.status,
+        'appointment': serialize_pending_appointment(appointment),
+    })
+
+
+def publish_status_changes(changes):
+    """
+    Publish status transitions as one event.
+    `changes` is a list of dicts with id, reference_id, previous_status,
+    status and scheduled_date.
+    """
+    if changes:
+        publish_dashboard_event('appointment.status', {'changes': changes})
+
+
+def publish_activity(entries):
+    if not entries:
+        return
+    from .dashboard import serialize_activity
+    publish_dashboard_event('activity.created', {
+        'activities': [serialize_activity(entry) for entry in entries],
+    })
+
+
+class DashboardStreamTicketView(APIView):
+    """
+    POST /api/v1/dashboard/stream/ticket/
+
+    Issue a single-use ticket for opening the dashboard stream from an
+    EventSource. It expires after DASHBOARD_STREAM_TICKET_SECONDS.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        ticket = secrets.token_urlsafe(24)
+        expires_in = getattr(settings, 'DASHBOARD_STREAM_TICKET_SECONDS', 30)
+        cache.set(f'{STREAM_TICKET_KEY_PREFIX}{ticket}', request.user.pk, expires_in)
+
+        return Response({
+            'success': True,
+            'data': {'ticket': ticket, 'expires_in': expires_in}
+        })
+
+
+def _redeem_ticket(ticket):
+    """
+    The user a stream ticket was issued to; the ticket is used up. Only
+    the caller whose delete removed the key may use it (DEL is atomic), so
+    concurrent connections with one ticket cannot both pass.
+    """
+    from django.contrib.auth import get_user_model
+
+    key = f'{STREAM_TICKET_KEY_PREFIX}{ticket}'
+    user_id = cache.get(key)
+    if user_id is None or not cache.delete(key):
+        return None
+    return get_user_model().objects.filter(pk=user_id).first()
+
+
+def _authenticate(request):
+    """
+    Resolve the admin user from `?ticket=` (browsers) or a Bearer header.
+    Returns None when not an authenticated admin.
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user = _redeem_ticket(ticket)
+    else:
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            return None
+        user = result[0] if result else None
+
+    if user is None:
+        return None
+    return user if user.is_active and user.is_staff else None
+
+
+async def _event_stream():
+    import redis.asyncio as aioredis
+
+    client = aioredis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(settings.DASHBOARD_STREAM_CHANNEL)
+    keepalive = getattr(settings, 'DASHBOARD_STREAM_KEEPALIVE_SECONDS', 15)
+
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=keepalive
+            )
+            if message is None:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+
+            payload = message['data']
+            if isinstance(payload, bytes):
+                payload = payload.decode()
+            event_type = json.loads(payload).get('type', 'message')
+            yield f'event: {event_type}\ndata: {payload}\n\n'
+    except asyncio.CancelledError:
+        raise
+    finally:
+        await pubsub.unsubscribe(settings.DASHBOARD_STREAM_CHANNEL)
+        await pubsub.aclose()
+        await client.aclose()
+
+
+@never_cache
+@require_GET
+@transaction.non_atomic_requests
+async def dashboard_stream(request):
+    """
+    GET /api/v1/dashboard/stream/?ticket=<ticket>
+
+    Server-Sent Events stream of dashboard deltas:
+    - appointment.created: new pending request (pending list row shape)
+    - appointment.status: status transitions, with previous status for counters
+    - activity.created: new activity feed entries
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({
+            'success': False,
+            'error': {
+                'code': 'NOT_AUTHENTICATED',
+                'message': 'Admin authentication required.',
+            }
+        }, status=401)
+
+    response = StreamingHttpResponse(_event_stream(), content_type='text/event-stream')
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,95 @@
+"""
+Celery tasks for core maintenance.
+"""
+
+from celery import shared_task
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def task_lock(name, timeout=None):
+    """
+    Cache lock so overlapping runs of a periodic task skip instead of
+    running concurrently (cache.add is SET NX with expiry on Redis).
+    Yields whether the lock was acquired; it expires after `timeout`
+    seconds (default: the task time limit) if the worker dies.
+    """
+    key = f'task-lock:{name}'
+    token = secrets.token_hex(8)
+    acquired = cache.add(key, token, timeout or getattr(settings, 'CELERY_TASK_TIME_LIMIT', 1800))
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+
+def _delete_in_batches(queryset, batch_size):
+    """Delete rows matched by queryset in primary-key batches."""
+    deleted = 0
+    while True:
+        batch = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        count, _ = queryset.model.objects.filter(id__in=batch).delete()
+        deleted += count
+
+
+@shared_task
+def prune_activity_log():
+    """
+    Enforce ACTIVITY_LOG_RETENTION_DAYS on the activity log.
+    Each action type is pruned separately so the deletes range-scan the
+    (action_type, created_at) index instead of the whole table.
+    """
+    from .models import ActivityLog
+
+    retention = dict(getattr(settings, 'ACTIVITY_LOG_RETENTION_DAYS', {}))
+    default_days = retention.pop('default', 180)
+    batch_size = getattr(settings, 'ACTIVITY_LOG_PRUNE_BATCH_SIZE', 1000)
+    now = timezone.now()
+
+    total = 0
+    for action_type in ActivityLog.ActionType.values:
+        cutoff = now - timedelta(days=retention.get(action_type, default_days))
+        total += _delete_in_batches(
+            ActivityLog.objects.filter(action_type=action_type, created_at__lt=cutoff),
+            batch_size
+        )
+
+    if total:
+        logger.info(f"Pruned {total} activity log entries")
+    return total
+
+
+@shared_task
+def prune_task_results():
+    """
+    Enforce TASK_RESULT_RETENTION_DAYS on the django_celery_results tables,
+    which held every task result before results moved to Redis.
+    """
+    from django_celery_results.models import TaskResult, GroupResult
+
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'TASK_RESULT_RETENTION_DAYS', 7))
+    batch_size = getattr(settings, 'TASK_RESULT_PRUNE_BATCH_SIZE', 1000)
+
+    with task_lock('prune-task-results') as acquired:
+        if not acquired:
+            logger.info("Task result pruning already running; skipping")
+            return 0
+
+        total = 0
+        for model in (TaskResult, GroupResult):
+            total += _delete_in_batches(model.objects.filter(date_done__lt=cutoff), batch_size)
+
+    if total:
+        logger.info(f"Pruned {total} stored task results")
+    return total
@@ -0,0 +1,26 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from kombu import Connection
+
+from config.celery import app
+
+
+@override_settings(TASK_QUEUES={'transactional': {'rate_limit': None}, 'bulk': {'rate_limit': '60/m'}})
+class QueueDepthsCommandTests(SimpleTestCase):
+    """queue_depths against an in-memory broker whose queues are empty."""
+
+    def setUp(self):
+        patcher = mock.patch.object(app, 'connection_for_read', lambda: Connection('memory://'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_drained_queues_report_zero(self):
+        out = StringIO()
+        call_command('queue_depths', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('  transactional           0           -', lines)
+        self.assertIn('  bulk                    0        60/m', lines)
@@ -6,12 +6,17 @@ Includes dashboard and utility endpoints.
 from django.urls import path
 from .dashboard import (
     DashboardSummaryView,
+    DashboardBootstrapView,
     PendingAppointmentsView,
     RecentActivityView,
     ApproveAppointmentView,
     RejectAppointmentView,
+    BulkAppointmentActionView,
     TodayAppointmentsView,
+    PatientHistoryView,
 )
+from .realtime import dashboard_stream, DashboardStreamTicketView
+from .analytics import UtilizationView, DemandForecastView, OverbookingMetricsView
 from .export_views import (
     ExportAppointmentsCSV,
     ExportDashboardStatsCSV,
@@ -21,12 +26,20 @@ app_name = 'core'
 
 urlpatterns = [
     # Dashboard APIs
+    path('bootstrap/', DashboardBootstrapView.as_view(), name='dashboard-bootstrap'),
     path('summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
     path('pending/', PendingAppointmentsView.as_view(), name='pending-appointments'),
     path('activity/', RecentActivityView.as_view(), name='recent-activity'),
     path('today/', TodayAppointmentsView.as_view(), name='today-appointments'),
+    path('stream/', dashboard_stream, name='dashboard-stream'),
+    path('stream/ticket/', DashboardStreamTicketView.as_view(), name='dashboard-stream-ticket'),
+    path('patients/<str:email_hash>/', PatientHistoryView.as_view(), name='patient-history'),
+    path('utilization/', UtilizationView.as_view(), name='utilization'),
+    path('forecast/', DemandForecastView.as_view(), name='demand-forecast'),
+    path('overbooking/', OverbookingMetricsView.as_view(), name='overbooking-metrics'),
     
     # Appointment actions
+    path('appointments/bulk/', BulkAppointmentActionView.as_view(), name='bulk-appointment-action'),
     path('appointments/<int:pk>/approve/', ApproveAppointmentView.as_view(), name='approve-appointment'),
     path('appointments/<int:pk>/reject/', RejectAppointmentView.as_view(), name='reject-appointment'),
     
@@ -2,9 +2,20 @@
 Core utility functions for TF Wellfare.
 """
 
+import hashlib
 import secrets
 import string
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from django.conf import settings
+from django.utils import timezone
+
+
+# Uppercase alphanumerics minus the easily confused O/0/I/1/L
+REFERENCE_ID_ALPHABET = ''.join(
+    c for c in string.ascii_uppercase + string.digits if c not in 'O0I1L'
+)
 
 
 def generate_reference_id(length=None):
@@ -16,16 +27,45 @@ def generate_reference_id(length=None):
     if length is None:
         length = getattr(settings, 'BOOKING_REFERENCE_ID_LENGTH', 12)
     
-    # Generate random alphanumeric string
-    alphabet = string.ascii_uppercase + string.digits
-    # Remove confusing characters
-    alphabet = alphabet.replace('O', '').replace('0', '').replace('I', '').replace('1', '').replace('L', '')
-    
-    random_part = ''.join(secrets.choice(alphabet) for _ in range(length - 4))
+    random_part = ''.join(secrets.choice(REFERENCE_ID_ALPHABET) for _ in range(length - 4))
     
     return f"TFW-{random_part}"
 
 
+def reference_id_space(length=None):
+    """Number of distinct IDs generate_reference_id() can produce."""
+    if length is None:
+        length = getattr(settings, 'BOOKING_REFERENCE_ID_LENGTH', 12)
+    return len(REFERENCE_ID_ALPHABET) ** (length - 4)
+
+
+def hash_email(email):
+    """
+    Stable SHA-256 hex digest of a normalized email.
+    Lets URLs and caches reference a patient without exposing the address.
+    """
+    return hashlib.sha256((email or '').strip().lower().encode()).hexdigest()
+
+
+@lru_cache(maxsize=512)
+def get_timezone(name):
+    """Cached tzinfo for an IANA name, or None if the name is unknown."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return None
+
+
+def clinic_timezone():
+    """Timezone the clinic's opening hours and appointment times are in."""
+    return get_timezone(getattr(settings, 'CLINIC_TIMEZONE', settings.TIME_ZONE)) or dt_timezone.utc
+
+
+def clinic_today():
+    """Today's date in the clinic's timezone."""
+    return timezone.now().astimezone(clinic_timezone()).date()
+
+
 def format_phone_number(phone):
     """Format phone number to a consistent format."""
     # Remove all non-numeric characters
@@ -6,7 +6,7 @@ from django.db import models
 from django.conf import settings
 from django.utils.text import slugify
 from django.utils import timezone
-from apps.core.models import TimeStampedModel, PublishableModel, SEOModel
+from apps.core.models import TimeStampedModel, PublishableModel, SEOModel, ReferenceIdModel
 
 
 class EventCategory(TimeStampedModel):
@@ -208,7 +208,7 @@ class Event(TimeStampedModel, PublishableModel, SEOModel):
         return modes.get(self.modality, modes['virtual'])
 
 
-class EventRegistration(TimeStampedModel):
+class EventRegistration(ReferenceIdModel, TimeStampedModel):
     """Registration for events."""
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='registrations')
     
@@ -222,6 +222,8 @@ class EventRegistration(TimeStampedModel):
     is_confirmed = models.BooleanField(default=False)
     attended = models.BooleanField(default=False)
     
+    reference_id_field = 'confirmation_code'
+    
     class Meta:
         verbose_name = 'Event Registration'
         verbose_name_plural = 'Event Registrations'
@@ -230,15 +232,15 @@ class EventRegistration(TimeStampedModel):
     def __str__(self):
         return f"{self.name} - {self.event.title}"
     
+    def get_reference_id_length(self):
+        return getattr(settings, 'EVENT_CONFIRMATION_CODE_LENGTH', 10)
+    
     def save(self, *args, **kwargs):
-        if not self.confirmation_code:
-            from apps.core.utils import generate_reference_id
-            self.confirmation_code = generate_reference_id(8)
+        adding = self._state.adding
+        super().save(*args, **kwargs)
         
-        # Increment event attendee count on new registration
-        if not self.pk:
+        # Increment event attendee count once the registration is stored
+        if adding:
             Event.objects.filter(pk=self.event_id).update(
                 current_attendees=models.F('current_attendees') + 1
             )
-        
-        super().save(*args, **kwargs)
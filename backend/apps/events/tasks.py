@@ -11,7 +11,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def send_event_registration_confirmation(self, registration_id):
     """Send event registration confirmation email."""
     try:
@@ -57,7 +57,7 @@ Best regards,
         raise self.retry(exc=e, countdown=60)
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_event_reminders():
     """Send reminder emails for events tomorrow."""
     from .models import EventRegistration, Event
@@ -9,6 +9,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 
+from apps.core.pagination import RegistrationKeysetPagination
 from .models import Event, EventCategory, EventRegistration
 from .serializers import (
     EventListSerializer,
@@ -133,7 +134,10 @@ class EventAdminViewSet(viewsets.ModelViewSet):
     def registrations(self, request, slug=None):
         """Get registrations for an event."""
         event = self.get_object()
-        registrations = event.registrations.all()
+        paginator = RegistrationKeysetPagination()
+        registrations = paginator.paginate_queryset(
+            event.registrations.all(), request, view=self
+        )
         
         data = [{
             'id': r.id,
@@ -146,8 +150,11 @@ class EventAdminViewSet(viewsets.ModelViewSet):
             'registered_at': r.created_at,
         } for r in registrations]
         
-        return Response({
+        # current_attendees is maintained on registration, so no COUNT(*)
+        response = Response({
             'success': True,
             'data': data,
-            'total': len(data)
+            'total': event.current_attendees,
+            'next': paginator.get_next_link(),
         })
+        return paginator.add_count_header(response)
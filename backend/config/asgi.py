@@ -1,5 +1,6 @@
 """
 ASGI config for TF Wellfare project.
+Required for the dashboard SSE stream (/api/v1/dashboard/stream/).
 """
 
 import os
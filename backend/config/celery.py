@@ -5,6 +5,8 @@ Handles async tasks for email dispatch & heavy logic.
 
 import os
 from celery import Celery
+from celery.signals import worker_init
+from kombu import Queue
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -18,19 +20,78 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
-# Celery Beat Schedule
-app.conf.beat_schedule = {
-    'cleanup-expired-pending-appointments': {
-        'task': 'apps.appointments.tasks.cleanup_expired_pending',
-        'schedule': 3600.0,  # Every hour
-    },
-    'send-appointment-reminders': {
-        'task': 'apps.appointments.tasks.send_appointment_reminders',
-        'schedule': 3600.0,  # Every hour
-    },
+# The beat schedule is defined once, in settings (CELERY_BEAT_SCHEDULE).
+
+# Queue topology. Each queue is consumed by its own worker (see
+# docker-compose.yml), so a reminder run can never sit in front of a
+# booking confirmation:
+#   transactional - single emails a visitor is waiting for
+#   bulk          - reminder runs and bulk-action fan-out
+#   maintenance   - periodic cleanup and analytics jobs
+# Per-queue rate limits live in settings.TASK_QUEUES.
+TASK_ROUTES = {
+    'apps.appointments.tasks.send_booking_confirmation': 'transactional',
+    'apps.appointments.tasks.send_appointment_approved': 'transactional',
+    'apps.appointments.tasks.send_appointment_rejected': 'transactional',
+    'apps.appointments.tasks.send_appointment_rescheduled': 'transactional',
+    'apps.events.tasks.send_event_registration_confirmation': 'transactional',
+    'apps.appointments.tasks.send_bulk_appointment_notifications': 'bulk',
+    'apps.appointments.tasks.send_appointment_reminders': 'bulk',
+    'apps.events.tasks.send_event_reminders': 'bulk',
+    'apps.appointments.tasks.cleanup_expired_pending': 'maintenance',
+    'apps.appointments.tasks.close_past_appointments': 'maintenance',
+    'apps.appointments.tasks.generate_demand_forecast': 'maintenance',
+    'apps.core.tasks.prune_activity_log': 'maintenance',
+    'apps.core.tasks.prune_task_results': 'maintenance',
+}
+
+# Tasks routed elsewhere that are also published straight to a queue with
+# apply_async(queue=...): bulk-action emails fanned out to the bulk queue
+QUEUE_FANOUT_TASKS = {
+    'bulk': [
+        'apps.appointments.tasks.send_appointment_approved',
+        'apps.appointments.tasks.send_appointment_rejected',
+    ],
 }
 
 
+def _queue_settings():
+    from django.conf import settings
+    return getattr(settings, 'TASK_QUEUES', {})
+
+
+app.conf.task_queues = [Queue(name) for name in _queue_settings()]
+app.conf.task_default_queue = 'bulk'
+app.conf.task_routes = {name: {'queue': queue} for name, queue in TASK_ROUTES.items()}
+
+
+@worker_init.connect
+def apply_queue_rate_limit(sender=None, **kwargs):
+    """
+    Celery rate limits are per task type, and the same email task runs on
+    both the transactional and bulk queues. A worker consuming a single
+    queue (-Q <name>) therefore applies that queue's rate limit, in its
+    own process only, to the tasks routed to the queue and the tasks
+    fanned out to it (QUEUE_FANOUT_TASKS). Other tasks keep their own
+    limits. Runs before the consumer builds its rate-limit buckets.
+    """
+    queues = list(sender.app.amqp.queues.consume_from)
+    if len(queues) != 1:
+        return
+    
+    queue = queues[0]
+    rate_limit = _queue_settings().get(queue, {}).get('rate_limit')
+    if not rate_limit:
+        return
+    
+    names = {name for name, routed_to in TASK_ROUTES.items() if routed_to == queue}
+    names.update(QUEUE_FANOUT_TASKS.get(queue, ()))
+    for name in names:
+        task = sender.app.tasks.get(name)
+        if task is not None:
+            task.rate_limit = rate_limit
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     """Debug task for testing Celery connectivity."""
@@ -62,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'apps.core.middleware.RateLimitMiddleware',
+    'apps.core.middleware.ActivityLogBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -167,6 +168,7 @@ REST_FRAMEWORK = {
         'anon': '100/hour',
         'user': '1000/hour',
         'booking': '10/hour',
+        'slot_hold': '30/hour',
     },
 }
 
@@ -205,7 +207,11 @@ REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 
 # Celery Configuration
 CELERY_BROKER_URL = REDIS_URL
-CELERY_RESULT_BACKEND = 'django-db'
+# Results go to Redis and expire after CELERY_RESULT_EXPIRES; notification
+# tasks set ignore_result and store nothing. The django_celery_results table
+# is kept for the admin and pruned nightly (prune_task_results).
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=REDIS_URL)
+CELERY_RESULT_EXPIRES = timedelta(hours=config('CELERY_RESULT_EXPIRES_HOURS', default=24, cast=int))
 CELERY_CACHE_BACKEND = 'default'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
@@ -213,15 +219,26 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
-CELERY_RESULT_EXTENDED = True
+CELERY_RESULT_EXTENDED = False
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
-# Celery Beat Schedule
+# Celery queues (routing is in config/celery.py; worker concurrency and
+# prefetch are set on each worker's command line in docker-compose.yml).
+# A worker consuming only one queue applies its rate_limit to every task it
+# runs, per task type.
+TASK_QUEUES = {
+    'transactional': {'rate_limit': None},
+    'bulk': {'rate_limit': config('CELERY_BULK_RATE_LIMIT', default='60/m')},
+    'maintenance': {'rate_limit': None},
+}
+
+# Celery Beat Schedule (the only schedule definition; config/celery.py
+# loads it via the CELERY_ namespace). Times are in CELERY_TIMEZONE.
 from celery.schedules import crontab
 CELERY_BEAT_SCHEDULE = {
     'send-appointment-reminders': {
         'task': 'apps.appointments.tasks.send_appointment_reminders',
-        'schedule': crontab(hour=9, minute=0),  # 9 AM daily
+        'schedule': crontab(minute=0),  # Hourly; picks up late approvals for tomorrow
     },
     'send-event-reminders': {
         'task': 'apps.events.tasks.send_event_reminders',
@@ -231,8 +248,30 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.appointments.tasks.cleanup_expired_pending',
         'schedule': crontab(hour=2, minute=0),  # 2 AM daily
     },
+    'close-past-appointments': {
+        'task': 'apps.appointments.tasks.close_past_appointments',
+        'schedule': crontab(minute=30),  # Hourly
+    },
+    'prune-task-results': {
+        'task': 'apps.core.tasks.prune_task_results',
+        'schedule': crontab(hour=3, minute=15),  # 3:15 AM daily
+    },
+    'prune-activity-log': {
+        'task': 'apps.core.tasks.prune_activity_log',
+        'schedule': crontab(hour=3, minute=0),  # 3 AM daily
+    },
+    'generate-demand-forecast': {
+        'task': 'apps.appointments.tasks.generate_demand_forecast',
+        'schedule': crontab(hour=3, minute=30),  # Nightly
+    },
 }
 
+# Dashboard push channel (SSE over Redis pub/sub, served via config.asgi)
+DASHBOARD_STREAM_ENABLED = config('DASHBOARD_STREAM_ENABLED', default=True, cast=bool)
+DASHBOARD_STREAM_CHANNEL = 'dashboard:events'
+DASHBOARD_STREAM_KEEPALIVE_SECONDS = 15
+DASHBOARD_STREAM_TICKET_SECONDS = 30
+
 # Cache Configuration
 CACHES = {
     'default': {
@@ -255,12 +294,66 @@ CLINIC_NAME = 'TF Wellfare Medical Clinic'
 CLINIC_PHONE = config('CLINIC_PHONE', default='+1 (555) 123-4567')
 CLINIC_EMAIL = config('CLINIC_EMAIL', default='contact@tfwellfare.com')
 CLINIC_ADDRESS = config('CLINIC_ADDRESS', default='123 Wellness Avenue, Health City, HC 12345')
+# Opening hours and appointment date/times are wall-clock times in this zone
+CLINIC_TIMEZONE = config('CLINIC_TIMEZONE', default='UTC')
 
 # Booking Configuration
 BOOKING_SLOT_DURATION_MINUTES = 30
 BOOKING_ADVANCE_DAYS_MIN = 1
 BOOKING_ADVANCE_DAYS_MAX = 60
 BOOKING_REFERENCE_ID_LENGTH = 12
+# 6 random characters (~887M codes); the old 4 collided within a few thousand rows
+EVENT_CONFIRMATION_CODE_LENGTH = 10
+# Upper bound for cached guest lookups; entries also expire at appointment start
+APPOINTMENT_LOOKUP_CACHE_SECONDS = 3600
+# Versioned /slots/ and /dates/ payloads; bumps invalidate earlier
+APPOINTMENT_AVAILABILITY_CACHE_SECONDS = 300
+# Soft holds on a slot while the booking form is open
+SLOT_HOLD_SECONDS = 600
+SLOT_HOLD_MAX_PER_CLIENT = 3
+# Utilization analytics, cached per date range
+ANALYTICS_UTILIZATION_CACHE_SECONDS = 900
+
+# Demand forecast (nightly): weeks of history, recency half-life, and how
+# many observations a sparse hour needs before its own no-show rate dominates
+DEMAND_FORECAST_HISTORY_WEEKS = 12
+DEMAND_FORECAST_HALF_LIFE_WEEKS = 4
+DEMAND_FORECAST_PRIOR_STRENGTH = 10
+
+# Overbooking: hours whose forecast no-show rate reaches the threshold (with
+# at least OVERBOOKING_MIN_OBSERVATIONS staff-recorded outcomes) accept up
+# to OVERBOOKING_MAX_PER_SLOT bookings per resource
+OVERBOOKING_ENABLED = config('OVERBOOKING_ENABLED', default=False, cast=bool)
+OVERBOOKING_NO_SHOW_THRESHOLD = config('OVERBOOKING_NO_SHOW_THRESHOLD', default=0.25, cast=float)
+OVERBOOKING_MAX_PER_SLOT = 2
+OVERBOOKING_MIN_OBSERVATIONS = 20
+
+# Activity Log Retention
+# Days to keep entries per action type; 'default' covers every other type.
+# Pruning walks the (action_type, created_at) index in batches.
+ACTIVITY_LOG_RETENTION_DAYS = {
+    'default': config('ACTIVITY_LOG_RETENTION_DAYS', default=180, cast=int),
+    'user_login': 30,
+    'user_logout': 30,
+}
+ACTIVITY_LOG_PRUNE_BATCH_SIZE = 1000
+
+# Rows older than this are removed from django_celery_results
+TASK_RESULT_RETENTION_DAYS = config('TASK_RESULT_RETENTION_DAYS', default=7, cast=int)
+TASK_RESULT_PRUNE_BATCH_SIZE = 1000
+
+# Appointments transitioned per transaction by the cleanup/auto-close jobs
+APPOINTMENT_CLEANUP_BATCH_SIZE = 500
+
+# Approved appointments still open this many hours after their start are
+# closed automatically, to the status mapped from their modality
+# ('completed' or 'no_show')
+APPOINTMENT_AUTO_CLOSE_ENABLED = config('APPOINTMENT_AUTO_CLOSE_ENABLED', default=True, cast=bool)
+APPOINTMENT_AUTO_CLOSE_GRACE_HOURS = 4
+APPOINTMENT_AUTO_CLOSE_STATUS = {
+    'virtual': 'completed',
+    'in_person': 'completed',
+}
 
 # Sentry Configuration
 SENTRY_DSN = config('SENTRY_DSN', default='')
@@ -3,6 +3,7 @@ Local development settings for TF Wellfare.
 """
 
 from .base import *
+from decouple import config
 
 DEBUG = True
 
@@ -21,6 +22,9 @@ CACHES = {
     }
 }
 
+# No Redis by default locally, so don't publish dashboard stream events
+DASHBOARD_STREAM_ENABLED = config('DASHBOARD_STREAM_ENABLED', default=False, cast=bool)
+
 # Console email backend
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
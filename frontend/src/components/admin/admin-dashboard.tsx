@@ -1,6 +1,6 @@
 "use client";
 
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { motion } from "framer-motion";
 import {
   Card,
@@ -66,7 +66,51 @@ interface Activity {
   created_at: string;
 }
 
+interface StatusChange {
+  id: number;
+  reference_id: string;
+  previous_status: string | null;
+  status: string;
+  scheduled_date: string;
+}
+
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+const ACTIVITY_LIMIT = 10;
+const STREAM_RETRY_MS = 5000;
+
+const localISODate = (offsetDays = 0) => {
+  const d = new Date();
+  d.setDate(d.getDate() + offsetDays);
+  return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(d.getDate()).padStart(2, "0")}`;
+};
+
+// What one appointment contributes to the live counters (mirrors the summary aggregates)
+const counterContribution = (status: string | null, scheduledDate: string) => {
+  const today = localISODate();
+  return {
+    pending_appointments: status === "pending" ? 1 : 0,
+    today_appointments:
+      scheduledDate === today && (status === "pending" || status === "approved") ? 1 : 0,
+    upcoming_appointments:
+      status === "approved" && scheduledDate >= today && scheduledDate <= localISODate(7) ? 1 : 0,
+  };
+};
+
+const applyCounterDelta = (
+  stats: DashboardStats,
+  previousStatus: string | null,
+  status: string,
+  scheduledDate: string
+): DashboardStats => {
+  const before = counterContribution(previousStatus, scheduledDate);
+  const after = counterContribution(status, scheduledDate);
+  return {
+    ...stats,
+    pending_appointments: stats.pending_appointments + after.pending_appointments - before.pending_appointments,
+    today_appointments: stats.today_appointments + after.today_appointments - before.today_appointments,
+    upcoming_appointments: stats.upcoming_appointments + after.upcoming_appointments - before.upcoming_appointments,
+  };
+};
 
 export function AdminDashboard({ onNavigate }: AdminDashboardProps) {
   const { toast } = useToast();
@@ -75,10 +119,12 @@ export function AdminDashboard({ onNavigate }: AdminDashboardProps) {
   const [pendingAppointments, setPendingAppointments] = useState<PendingAppointment[]>([]);
   const [activities, setActivities] = useState<Activity[]>([]);
   const [actionLoading, setActionLoading] = useState<number | null>(null);
+  // True while the live stream is connected; deltas then replace re-fetching
+  const streamLive = useRef(false);
 
   // Fetch dashboard data
-  const fetchDashboardData = async () => {
-    setLoading(true);
+  const fetchDashboardData = async (showLoading = true) => {
+    if (showLoading) setLoading(true);
     const token = localStorage.getItem("accessToken");
     const headers: Record<string, string> = {
       "Content-Type": "application/json",
@@ -88,31 +134,18 @@ export function AdminDashboard({ onNavigate }: AdminDashboardProps) {
     }
 
     try {
-      // Fetch stats, pending appointments, and activity in parallel
-      const [statsRes, pendingRes, activityRes] = await Promise.all([
-        fetch(`${API_URL}/api/v1/dashboard/summary/`, { headers }),
-        fetch(`${API_URL}/api/v1/dashboard/pending/`, { headers }),
-        fetch(`${API_URL}/api/v1/dashboard/activity/`, { headers }),
-      ]);
-
-      if (statsRes.ok) {
-        const statsData = await statsRes.json();
-        if (statsData.success) {
-          setStats(statsData.data.stats);
-        }
-      }
-
-      if (pendingRes.ok) {
-        const pendingData = await pendingRes.json();
-        if (pendingData.success) {
-          setPendingAppointments(pendingData.data.appointments);
-        }
-      }
+      // Fetch stats, pending appointments, and activity in one call
+      const res = await fetch(
+        `${API_URL}/api/v1/dashboard/bootstrap/?sections=summary,pending,activity`,
+        { headers }
+      );
 
-      if (activityRes.ok) {
-        const activityData = await activityRes.json();
-        if (activityData.success) {
-          setActivities(activityData.data.activities);
+      if (res.ok) {
+        const bootstrapData = await res.json();
+        if (bootstrapData.success) {
+          setStats(bootstrapData.data.summary.stats);
+          setPendingAppointments(bootstrapData.data.pending.appointments);
+          setActivities(bootstrapData.data.activity.activities);
         }
       }
     } catch (error) {
@@ -130,6 +163,107 @@ export function AdminDashboard({ onNavigate }: AdminDashboardProps) {
     fetchDashboardData();
   }, []);
 
+  // Live deltas over Server-Sent Events. EventSource cannot send headers, so
+  // each connection uses a fresh single-use ticket; after a drop we reconnect
+  // with a new ticket and re-fetch once to catch up on missed events.
+  useEffect(() => {
+    let source: EventSource | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+    let reconnecting = false;
+
+    const scheduleReconnect = () => {
+      streamLive.current = false;
+      source?.close();
+      source = null;
+      if (!closed && !retryTimer) {
+        reconnecting = true;
+        retryTimer = setTimeout(() => {
+          retryTimer = null;
+          connect();
+        }, STREAM_RETRY_MS);
+      }
+    };
+
+    const connect = async () => {
+      const token = localStorage.getItem("accessToken");
+      try {
+        const res = await fetch(`${API_URL}/api/v1/dashboard/stream/ticket/`, {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+          },
+        });
+        // Not an admin (or the session expired): stay on manual refresh
+        if (res.status === 401 || res.status === 403) return;
+        const data = await res.json();
+        if (!data.success) {
+          scheduleReconnect();
+          return;
+        }
+        if (closed) return;
+
+        source = new EventSource(
+          `${API_URL}/api/v1/dashboard/stream/?ticket=${encodeURIComponent(data.data.ticket)}`
+        );
+        source.onopen = () => {
+          streamLive.current = true;
+          if (reconnecting) {
+            reconnecting = false;
+            fetchDashboardData(false);
+          }
+        };
+        source.onerror = scheduleReconnect;
+
+        source.addEventListener("appointment.created", (event) => {
+          const { status, appointment } = JSON.parse((event as MessageEvent).data).data;
+          setStats((prev) => prev && applyCounterDelta(prev, null, status, appointment.scheduled_date));
+          if (status === "pending") {
+            setPendingAppointments((prev) =>
+              prev.some((apt) => apt.id === appointment.id) ? prev : [appointment, ...prev]
+            );
+          }
+        });
+
+        source.addEventListener("appointment.status", (event) => {
+          const { changes } = JSON.parse((event as MessageEvent).data).data as { changes: StatusChange[] };
+          setStats((prev) =>
+            prev &&
+            changes.reduce(
+              (acc, change) => applyCounterDelta(acc, change.previous_status, change.status, change.scheduled_date),
+              prev
+            )
+          );
+          const leftPending = new Set(
+            changes.filter((change) => change.status !== "pending").map((change) => change.id)
+          );
+          setPendingAppointments((prev) => prev.filter((apt) => !leftPending.has(apt.id)));
+        });
+
+        source.addEventListener("activity.created", (event) => {
+          const { activities: incoming } = JSON.parse((event as MessageEvent).data).data as { activities: Activity[] };
+          setActivities((prev) => {
+            const known = new Set(prev.map((activity) => activity.id));
+            const fresh = incoming.filter((activity) => !known.has(activity.id)).reverse();
+            return [...fresh, ...prev].slice(0, ACTIVITY_LIMIT);
+          });
+        });
+      } catch (error) {
+        scheduleReconnect();
+      }
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      streamLive.current = false;
+      if (retryTimer) clearTimeout(retryTimer);
+      source?.close();
+    };
+  }, []);
+
   // Approve appointment
   const handleApprove = async (appointmentId: number) => {
     setActionLoading(appointmentId);
@@ -158,8 +292,8 @@ export function AdminDashboard({ onNavigate }: AdminDashboardProps) {
         setPendingAppointments((prev) =>
           prev.filter((apt) => apt.id !== appointmentId)
         );
-        // Refresh stats
-        fetchDashboardData();
+        // Stats arrive as a stream delta; re-fetch only without the stream
+        if (!streamLive.current) fetchDashboardData();
       } else {
         toast({
           title: "Error",
@@ -210,7 +344,7 @@ export function AdminDashboard({ onNavigate }: AdminDashboardProps) {
         setPendingAppointments((prev) =>
           prev.filter((apt) => apt.id !== appointmentId)
         );
-        fetchDashboardData();
+        if (!streamLive.current) fetchDashboardData();
       } else {
         toast({
           title: "Error",
@@ -330,7 +464,7 @@ export function AdminDashboard({ onNavigate }: AdminDashboardProps) {
         <Button
           variant="outline"
           size="sm"
-          onClick={fetchDashboardData}
+          onClick={() => fetchDashboardData()}
           disabled={loading}
         >
           <RefreshCw className={`h-4 w-4 mr-2 ${loading ? "animate-spin" : ""}`} />